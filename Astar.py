@@ -10,11 +10,19 @@ Reference: Tech with Tim A* Tutorial on youtube.
 
 import pygame
 import math
+import heapq
+import time
 from queue import PriorityQueue
 
+from BitFlood import FloodComponents
+from GridMap import Components, GridMap, LazyCells
+from PathCodec import encode_path
+from SolverThread import SolverThread
+from Viewport import ObstaclePyramid, Viewport
+
 WIDTH = 800 # the width of our square map
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("A* Shortest Path Algorithm")
+FPS = 60 # frame cap of the main loop
+LABEL_ROWS = 256 # the GUI keeps a Components index up to this many rows, larger maps flood per query instead
 
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
@@ -116,23 +124,19 @@ def reconstruct_path(came_from, current, draw): # This function helps visualize
 
 # DEFINE THE A* ALGORITHM
 
-def algorithm(draw, cells, start, end):
+def algorithm(draw, cells, start, end, components=None):
+    if components is not None and not components.connected(start, end):
+        return False # end is walled off from start, so don't flood the whole reachable region
+
     count = 0 # count is to keep track of the order in which things are added to the queue
     open_set = PriorityQueue() # gives us the node with lowest f. If lowest f repeated, then lowest count!
     open_set.put((0, count, start)) # add the start node with it's f score, and count, into the priority queue
     came_from = {} # from what node, did a node come from
-    g_score = {point: float("inf") for row in cells for point in row} # assume inf g scores for all the nodes except start node
-    g_score[start] = 0
-    f_score = {point: float("inf") for row in cells for point in row} # assume inf f scores for all the nodes except start node
-    f_score[start] = h(start.get_pos(), end.get_pos()) # f score = g score + h score
+    g_score = {start: 0} # only cells we touched get a g score, missing cells count as inf. The f score lives in the queue
 
     open_set_hash = {start} # this helps us know which items are in the priority queue and not in the priority queue
 
     while not open_set.empty(): # if we haven't gone through all the nodes yet
-        for event in pygame.event.get(): # helps us quit the algorithm if we wish
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
         current = open_set.get()[2] # current node/point we are looking at = node with the lowest f score
         open_set_hash.remove(current) # to remove the node with the lowest f score. If same f scores, choose the lowest count!
 
@@ -142,16 +146,16 @@ def algorithm(draw, cells, start, end):
             start.make_start()
             return True
 
+        current.update_neighbors(cells) # linked when expanded, so only the cells the search reaches get a Point
         for neighbor in current.neighbors:
             temp_g_score = g_score[current] + 1 # g score of neighbor nodes = g score of node + 1
 
-            if temp_g_score < g_score[neighbor]: # update g score of a node only if its new g score is lower than the previous one
+            if temp_g_score < g_score.get(neighbor, float("inf")): # update g score of a node only if its new g score is lower than the previous one
                 came_from[neighbor] = current
                 g_score[neighbor] = temp_g_score
-                f_score[neighbor] = temp_g_score + h(neighbor.get_pos(), end.get_pos()) # f = g + h
                 if neighbor not in open_set_hash: # add neighbor node to open set hash if neighbor was not visited previously
                     count += 1
-                    open_set.put((f_score[neighbor], count, neighbor))
+                    open_set.put((temp_g_score + h(neighbor.get_pos(), end.get_pos()), count, neighbor)) # f = g + h
                     open_set_hash.add(neighbor)
                     neighbor.make_open()
 
@@ -163,6 +167,226 @@ def algorithm(draw, cells, start, end):
     return False # if we did not find a path!
 
 
+# the same search without the GUI: nothing is drawn or recolored, and the path is returned instead.
+# It returns the (row, col) cells from start to end, or None if there is no path.
+# With compact=True the path comes back run-length encoded as bytes (see PathCodec.py), to cache or send it cheaply.
+# Call update_neighbors on every cell before searching, as PathServer does (main links cells as it expands them).
+
+def shortest_path(cells, start, end, components=None, compact=False):
+    if components is not None and not components.connected(start, end):
+        return None
+
+    count = 0
+    open_set = [(h(start.get_pos(), end.get_pos()), count, start)] # a plain heap: no locking needed outside the GUI thread
+    came_from = {}
+    g_score = {start: 0} # only cells we touched get a score, missing cells count as inf
+    closed = set()
+
+    while open_set:
+        current = heapq.heappop(open_set)[2]
+        if current in closed: # stale entry, this cell was already expanded with a lower score
+            continue
+        closed.add(current)
+
+        if current == end:
+            path = [(end.row, end.col)]
+            while current in came_from:
+                current = came_from[current]
+                path.append((current.row, current.col))
+            path.reverse()
+            return encode_path(path) if compact else path
+
+        for neighbor in current.neighbors:
+            temp_g_score = g_score[current] + 1
+            if temp_g_score < g_score.get(neighbor, float("inf")):
+                came_from[neighbor] = current
+                g_score[neighbor] = temp_g_score
+                count += 1
+                heapq.heappush(open_set, (g_score[neighbor] + h(neighbor.get_pos(), end.get_pos()), count, neighbor))
+
+    return None
+
+
+
+# MEMORY-BOUNDED SEARCH
+# shortest_path keeps a heap, a closed set and the scores of every cell it touched. For workers with little memory:
+# - fringe_search: no heap and no closed set. Cells wait in a "now" list and a "later" list. A cell whose f is
+#   within the threshold is expanded straight away, depth first; the others wait in later for the next pass,
+#   whose threshold is the lowest f that was over it. Only touched cells keep a (g score, parent) entry.
+# - ida_star: iterative deepening on f. Each pass is a depth first search from start that stops at cells over
+#   the threshold, so it needs the current path only, at the price of searching the same cells again every pass.
+#   Grids have many equally long ways into a cell, so each pass also remembers the lowest g it reached up to
+#   table_size cells with, and doesn't search below a cell again when it comes back with a g that is no lower.
+#   table_size=0 is plain IDA*, with memory for the path only.
+# Both return the same shortest paths as shortest_path, as (row, col) cells or None.
+
+def fringe_search(cells, start, end, components=None):
+    if components is not None and not components.connected(start, end):
+        return None
+
+    goal = end.get_pos()
+    cache = {start: (0, None)} # cell -> (g score, parent), only for cells we touched
+    threshold = h(start.get_pos(), goal)
+    now = [start]
+
+    while now:
+        later = []
+        next_threshold = float("inf")
+        while now:
+            current = now.pop() # from the back: the children just added are looked at first
+            g = cache[current][0]
+            f = g + h(current.get_pos(), goal)
+            if f > threshold:
+                next_threshold = min(next_threshold, f)
+                later.append(current)
+                continue
+
+            if current == end:
+                path = []
+                while current is not None:
+                    path.append((current.row, current.col))
+                    current = cache[current][1]
+                path.reverse()
+                return path
+
+            for neighbor in reversed(current.neighbors): # reversed, so they pop in neighbour order
+                if g + 1 < cache.get(neighbor, (float("inf"),))[0]:
+                    cache[neighbor] = (g + 1, current)
+                    now.append(neighbor) # a cell can be listed twice; the stale copy reads the new g score
+        later.reverse() # keep the order they were found in for the next pass
+        now = later
+        threshold = next_threshold
+
+    return None
+
+
+def ida_star(cells, start, end, components=None, table_size=1 << 16):
+    if components is not None and not components.connected(start, end):
+        return None
+
+    goal = end.get_pos()
+    threshold = h(start.get_pos(), goal)
+
+    while True:
+        next_threshold = float("inf")
+        path = [start] # the cells from start to the one being expanded; g of a new cell is len(path)
+        on_path = {start} # don't walk in circles
+        stack = [iter(start.neighbors)] # the neighbours still to try at every depth
+        table = {start: 0} # cell -> lowest g reached in this pass, for at most table_size cells
+
+        while stack:
+            if path[-1] == end:
+                return [(point.row, point.col) for point in path]
+            for neighbor in stack[-1]:
+                g = len(path)
+                if neighbor in on_path or table.get(neighbor, g + 1) <= g: # already searched from here this pass
+                    continue
+                f = g + h(neighbor.get_pos(), goal)
+                if f > threshold:
+                    next_threshold = min(next_threshold, f)
+                    continue
+                if neighbor in table or len(table) < table_size:
+                    table[neighbor] = g
+                path.append(neighbor)
+                on_path.add(neighbor)
+                stack.append(iter(neighbor.neighbors))
+                break
+            else: # every neighbour tried, back up
+                stack.pop()
+                on_path.remove(path.pop())
+
+        if next_threshold == float("inf"):
+            return None # nothing was cut off, so the whole reachable region was searched
+        threshold = next_threshold
+
+
+# ANYTIME A* (ARA*)
+# Search with an inflated heuristic first (f = g + epsilon * h), which finds a path quickly that is at most
+# epsilon times longer than the shortest one. Then lower epsilon and improve it, reusing the g scores of the
+# previous search: only cells whose g score improved since they were expanded are looked at again.
+# anytime_paths yields (path, bound) every time it finds a better path, where bound is the guaranteed
+# suboptimality: the path is at most bound times longer than the shortest. bound 1 means optimal.
+
+def anytime_paths(cells, start, end, epsilon=3.0, step=0.5, deadline=None, components=None):
+    if components is not None and not components.connected(start, end):
+        return
+
+    inf = float("inf")
+    goal = end.get_pos()
+    g_score = {start: 0}
+    came_from = {}
+    open_set = {start: epsilon * h(start.get_pos(), goal)} # cell -> its key when it was pushed
+    heap = [(open_set[start], 0, start)]
+    count = 0
+    closed = set()
+    incons = set() # cells improved after they were expanded in this round; they wait for the next round
+    reported = None
+
+    while True:
+        while heap and g_score.get(end, inf) > heap[0][0]: # improve the path while any open cell could beat it
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            key, _, current = heapq.heappop(heap)
+            if open_set.get(current) != key: # stale entry
+                continue
+            del open_set[current]
+            closed.add(current)
+
+            for neighbor in current.neighbors:
+                temp_g_score = g_score[current] + 1
+                if temp_g_score < g_score.get(neighbor, inf):
+                    came_from[neighbor] = current
+                    g_score[neighbor] = temp_g_score
+                    if neighbor in closed:
+                        incons.add(neighbor)
+                    else:
+                        count += 1
+                        open_set[neighbor] = temp_g_score + epsilon * h(neighbor.get_pos(), goal)
+                        heapq.heappush(heap, (open_set[neighbor], count, neighbor))
+
+        if end not in g_score:
+            return # nothing left to expand: there is no path
+
+        # the shortest path is no shorter than the lowest un-inflated f among the cells still pending
+        pending = [g_score[p] + h(p.get_pos(), goal) for p in list(open_set) + list(incons)]
+        bound = min(epsilon, g_score[end] / min(pending)) if pending and g_score[end] > 0 else 1.0
+        if (g_score[end], bound) != reported: # only report progress
+            reported = (g_score[end], bound)
+            path = [(end.row, end.col)]
+            current = end
+            while current in came_from:
+                current = came_from[current]
+                path.append((current.row, current.col))
+            path.reverse()
+            yield path, max(bound, 1.0)
+
+        if bound <= 1.0:
+            return
+        epsilon = max(1.0, epsilon - step)
+        for p in incons: # next round: everything pending, keyed with the new epsilon
+            open_set[p] = None
+        incons = set()
+        heap = []
+        for p in open_set:
+            count += 1
+            open_set[p] = g_score[p] + epsilon * h(p.get_pos(), goal)
+            heap.append((open_set[p], count, p))
+        heapq.heapify(heap)
+        closed = set()
+
+
+# anytime search with a per-query time budget: returns the best (path, bound) found within time_limit seconds.
+# (None, 1.0) means there is no path at all; (None, inf) means time ran out before any path was found.
+
+def anytime_search(cells, start, end, time_limit, epsilon=3.0, step=0.5, components=None):
+    deadline = time.perf_counter() + time_limit
+    path, bound = None, float("inf")
+    for path, bound in anytime_paths(cells, start, end, epsilon, step, deadline, components):
+        pass
+    if path is None and time.perf_counter() <= deadline:
+        return None, 1.0 # the search ran out of cells, not of time
+    return path, bound
+
 
 # define a function to define each cell within the grid map. Width here is map width
 # each cell inside cells is an instance of the class Point
@@ -179,62 +403,73 @@ def make_cells(rows, width):
     return cells
 
 
-# define a function to draw the grid lines inside the grid map. Width here is the map width
-
-def draw_grid(win, rows, width):
-    increment = width // rows
-    for i in range(rows):
-        pygame.draw.line(win, GREY, (0, i * increment), (width, i * increment))
-    for j in range(rows):
-        pygame.draw.line(win, GREY, (j * increment, 0), (j * increment, width))
-
 # for the following function, assume that we already know which row, and which point (node) inside the row.
-# Note that the point is an instance of Point, based on the position of the point 
-# Then we can say the following
+# Only the part of the map inside the viewport is drawn, see Viewport.py. markers stay visible when zoomed out
 
-def draw(win, cells, rows, width):
-    win.fill(WHITE)
-    for row in cells:
-        for point in row:
-            point.draw(win)
-
-    draw_grid(win, rows, width)
+def draw(win, cells, view, pyramid, markers=()):
+    view.render(win, cells, pyramid, markers)
     pygame.display.update()
 
-# A function to find the cell position of the point clicked by the user
+###
 
-def get_clicked_pose(pos, rows, width):
-    increment = width // rows
-    y, x = pos
-    
-    row = y // increment
-    col = x // increment
+def main(win, width, rows=50, grid=None): # grid is a GridMap to start from, instead of an empty map
+    ROWS = grid.rows if grid else rows
 
-    return row, col
+    base = grid or GridMap(ROWS)
 
-###
+    def fresh_cells(): # Points are only made for the cells that are drawn, clicked or searched, see LazyCells
+        work = GridMap(ROWS, base.barriers) # barrier edits of a large map land here, base stays as it was loaded
+        cells = LazyCells(work, lambda row, col: Point(row, col, width // ROWS, ROWS))
+        # labelling every cell needs every Point, so large maps check reachability with one flood per query
+        components = Components(cells) if ROWS <= LABEL_ROWS else FloodComponents(work)
+        return cells, components
 
-def main(win, width):
-    ROWS = 50
-    cells = make_cells(ROWS, width)
+    cells, components = fresh_cells()
+    view = Viewport(ROWS, width)
+    pyramid = ObstaclePyramid.from_grid(base)
 
     start = None # keep track on the start and end position
     end = None
 
+    clock = pygame.time.Clock()
+    solver = None # the search, running on its own thread so the window stays responsive
+    dirty = True # only redraw when something changed
     run = True # know if you started the main loop
     started = False # know if you started the algorithm
     while run:
-        draw(win, cells, ROWS, width)
-        for event in pygame.event.get():
+        if started and not solver.is_alive(): # finished, or cancelled
+            if solver.error is not None:
+                raise solver.error
+            started = False
+            solver = None
+            dirty = True
+
+        if dirty or started: # while searching, show its progress at the frame rate
+            draw(win, cells, view, pyramid, (start, end))
+            dirty = False
+        clock.tick(FPS)
+
+        # when idle, sleep until something happens instead of spinning
+        events = pygame.event.get() if started else [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
 
-            if started:
-                continue # user should not be able to change stuff while the algorithm is running
+            if view.handle(event): # zoom and pan
+                dirty = True
+                continue
+
+            if started: # user should not be able to change stuff while the algorithm is running
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_c):
+                    solver.cancel() # Press escape (or c) to stop the search
+                continue
+
+            if event.type != pygame.MOUSEMOTION or any(event.buttons): # plain mouse moves change nothing
+                dirty = True
 
-            if pygame.mouse.get_pressed()[0]: # Left mouse button
-                pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pose(pos, ROWS, width)
+            clicked = view.cell_at(pygame.mouse.get_pos()) # clicks go through the zoom and pan of the view
+            if clicked and pygame.mouse.get_pressed()[0]: # Left mouse button
+                row, col = clicked
                 point = cells[row][col]
                 if not start and point != end: # define the start position if it hasn't been done yet
                     start = point
@@ -246,12 +481,15 @@ def main(win, width):
 
                 elif point != end and point != start: # the remaining blocks we click are the obstacles
                     point.make_barrier()
+                    components.add_barrier(point)
+                    pyramid.set_barrier(row, col)
 
-            elif pygame.mouse.get_pressed()[2]: # Right mouse button
-                pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pose(pos, ROWS, width)
+            elif clicked and pygame.mouse.get_pressed()[2]: # Right mouse button
+                row, col = clicked
                 point = cells[row][col]
                 point.reset() 
+                components.remove_barrier(point)
+                pyramid.set_barrier(row, col, False)
                 if point == start: # basically, you can reset the start and end point by right clicking
                     start == None
                 elif point == end:
@@ -259,18 +497,34 @@ def main(win, width):
                 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE and start and end:
-                    for row in cells:
-                        for point in row:
-                            point.update_neighbors(cells)
+                    # the search reports each step; that is where it notices it was cancelled
+                    solver = SolverThread(lambda report: algorithm(report, cells, start, end, components))
+                    solver.start()
+                    started = True
 
-                    algorithm(lambda: draw(win, cells, ROWS, width), cells, start, end)
-
-                if event.key == pygame.K_c: # Press c to clear screen
+                if event.key == pygame.K_c: # Press c to clear screen, back to the map we started from
                     start = None
                     end = None
-                    cells = make_cells(ROWS, width)
-            
-    pygame.quit()
+                    cells, components = fresh_cells()
+                    pyramid = ObstaclePyramid.from_grid(base)
 
-main(WIN, WIDTH)
+    if solver is not None:
+        solver.cancel()
+        solver.join()
+    pygame.quit()
 
+# only open the window when run as a script, so the search functions can be imported headless
+
+if __name__ == "__main__":
+    import sys
+    from GridMap import load_map
+
+    rows, grid = 50, None
+    if len(sys.argv) > 1: # python Astar.py [rows | map file]
+        if sys.argv[1].isdigit():
+            rows = int(sys.argv[1])
+        else:
+            grid = load_map(sys.argv[1])
+    WIN = pygame.display.set_mode((WIDTH, WIDTH))
+    pygame.display.set_caption("A* Shortest Path Algorithm")
+    main(WIN, WIDTH, rows, grid)
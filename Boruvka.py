@@ -0,0 +1,206 @@
+"""
+BORUVKA'S MINIMUM SPANNING FOREST, ON ALL CORES
+
+Kruskal's algorithm sorts every edge, then scans them one by one. Boruvka's algorithm works in rounds instead:
+every component picks its cheapest outgoing edge, all those edges join the forest at once, and the number of
+components at least halves. Picking the cheapest edges is independent per edge, so each round is split across
+worker processes that read the edges from shared memory.
+
+Ties are broken by the position of the edge in the input, which is exactly the order Kruskal's stable sort
+uses. So the forest is the same one Kruskals.algorithm returns, not just one of the same weight.
+
+USAGE:
+    python Boruvka.py --nodes 1000000 --edges 10000000 --workers 8
+runs both on a random graph and compares them.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# worker processes. They attach to the shared edge arrays once, then answer one chunk per task
+
+_shared = {}
+
+def attach(specs):
+    for name, (shm_name, dtype, length) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray((length,), dtype=dtype, buffer=shm.buf))
+
+
+def pick_cheapest(comps, edges, w, n):
+    """
+    Given candidate (component, edge position) pairs, keep the cheapest edge of every component: lowest weight,
+    then lowest position. Compaction keeps edges in input order, so position order is input order.
+    """
+    weights = w[edges]
+    best = np.full(n, np.inf)
+    np.minimum.at(best, comps, weights)
+    tied = weights == best[comps]
+    first = np.full(n, len(w), dtype=np.int64)
+    np.minimum.at(first, comps[tied], edges[tied])
+    winners = np.nonzero(first < len(w))[0]
+    return winners, first[winners]
+
+
+def cheapest_edges(lo, hi, arrays=None):
+    """
+    For every component touched by edges lo:hi, its cheapest outgoing edge in that range, as two arrays
+    (component labels, edge positions).
+    """
+    if arrays is None:
+        arrays = {name: array for name, (_, array) in _shared.items()}
+    label, u, v, w = (arrays[name] for name in ("label", "u", "v", "w"))
+
+    lu = label[u[lo:hi]]
+    lv = label[v[lo:hi]]
+    cross = np.nonzero(lu != lv)[0]
+    edges = cross + lo
+    comps = np.concatenate((lu[cross], lv[cross])) # an edge is a candidate for both of its components
+    return pick_cheapest(comps, np.concatenate((edges, edges)), w, len(label))
+
+
+def minimum_spanning_forest(u, v, w, n, workers=None, chunk=1 << 20):
+    """
+    u, v and w are equally long sequences describing edges between nodes 0 .. n-1.
+    Returns the original indices of the forest edges, in the order Kruskal's algorithm would add them.
+    """
+    m = len(u)
+    workers = workers or os.cpu_count() or 1
+    if m <= chunk:
+        workers = 1 # not worth the process start-up
+
+    columns = { # private copies: the rounds compact them in place
+        "u": np.array(u, dtype=np.int64, copy=True),
+        "v": np.array(v, dtype=np.int64, copy=True),
+        "w": np.array(w, dtype=np.float64, copy=True),
+        "orig": np.arange(m, dtype=np.int64),
+        "label": np.arange(n, dtype=np.int64), # component of every node, named after one of its nodes
+    }
+
+    segments = []
+    pool = None
+    try:
+        if workers > 1:
+            arrays, specs = {}, {}
+            for name, column in columns.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+                segments.append(shm)
+                arrays[name] = np.ndarray(column.shape, dtype=column.dtype, buffer=shm.buf)
+                arrays[name][:] = column
+                specs[name] = (shm.name, column.dtype.str, len(column))
+            pool = ProcessPoolExecutor(workers, initializer=attach, initargs=(specs,))
+        else:
+            arrays = columns
+        return boruvka_rounds(arrays, m, n, workers, chunk, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def boruvka_rounds(arrays, m, n, workers, chunk, pool):
+    label, u, v, w, orig = (arrays[name] for name in ("label", "u", "v", "w", "orig"))
+    forest, weights = [], []
+    active = m # edges that may still cross components are kept at the front of the arrays
+
+    while active:
+        step = max(1, min(chunk, -(-active // workers)))
+        ranges = [(lo, min(lo + step, active)) for lo in range(0, active, step)]
+        if pool is None:
+            results = [cheapest_edges(lo, hi, arrays) for lo, hi in ranges]
+        else:
+            results = list(pool.map(cheapest_edges, *zip(*ranges)))
+
+        comps = np.concatenate([r[0] for r in results])
+        edges = np.concatenate([r[1] for r in results])
+        if len(comps) == 0:
+            break
+        comps, edges = pick_cheapest(comps, edges, w, n) # combine the per-chunk winners
+
+        # every component points at the component across its cheapest edge. With a strict order on edges
+        # the only cycles are pairs that picked the same edge; the lower label of such a pair becomes the root
+        succ = np.arange(n, dtype=np.int64)
+        other = label[u[edges]] + label[v[edges]] - comps
+        succ[comps] = other
+        mutual = (succ[other] == comps) & (comps < other)
+        succ[comps[mutual]] = comps[mutual]
+        while True: # pointer jumping until everyone points at its root
+            jumped = succ[succ]
+            if np.array_equal(jumped, succ):
+                break
+            succ = jumped
+        label[:] = succ[label]
+
+        chosen = np.unique(edges) # a pair that picked the same edge adds it once
+        forest.append(orig[chosen])
+        weights.append(w[chosen])
+
+        # filter: drop edges that now lie inside a component, once they are a good share of the array
+        inside = label[u[:active]] == label[v[:active]]
+        kept = active - int(np.count_nonzero(inside))
+        if kept <= active // 2:
+            keep = ~inside
+            for column in (u, v, w, orig):
+                column[:kept] = column[:active][keep]
+            active = kept
+
+    if not forest:
+        return np.empty(0, np.int64)
+    forest = np.concatenate(forest)
+    weights = np.concatenate(weights)
+    return forest[np.lexsort((forest, weights))] # the order Kruskal's algorithm adds them in
+
+
+def algorithm(graph, V, workers=None):
+    """
+    Drop-in for Kruskals.algorithm: graph is a list of [u, v, w] edges between the nodes in V.
+    Returns the minimum spanning forest as [u, v, w] edges.
+    """
+    index = {node: i for i, node in enumerate(V)}
+    u = np.fromiter((index[e[0]] for e in graph), dtype=np.int64, count=len(graph))
+    v = np.fromiter((index[e[1]] for e in graph), dtype=np.int64, count=len(graph))
+    w = np.fromiter((e[2] for e in graph), dtype=np.float64, count=len(graph))
+    return [graph[i] for i in minimum_spanning_forest(u, v, w, len(V), workers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Boruvka's and Kruskal's algorithms on a random graph.")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    u = rng.integers(0, args.nodes, args.edges)
+    v = rng.integers(0, args.nodes, args.edges)
+    w = rng.integers(1, 1000, args.edges).astype(np.float64) # plenty of ties, to exercise tie breaking
+
+    inputs = [u.copy(), v.copy(), w.copy()]
+
+    began = time.perf_counter()
+    forest = minimum_spanning_forest(u, v, w, args.nodes, args.workers)
+    boruvka_time = time.perf_counter() - began
+    assert all(np.array_equal(a, b) for a, b in zip((u, v, w), inputs)), "the input edge arrays were modified"
+    print(f"boruvka: {len(forest)} edges, weight {w[forest].sum():.0f}, {boruvka_time:.2f}s")
+
+    from Kruskals import OnlineMST # sort + union-find, the same scan as Kruskals.algorithm without V.index
+
+    began = time.perf_counter()
+    mst = OnlineMST()
+    mst.add_batch([[int(a), int(b), float(c)] for a, b, c in zip(u, v, w)])
+    kruskal_time = time.perf_counter() - began
+    print(f"kruskal: {len(mst.edges())} edges, weight {mst.total:.0f}, {kruskal_time:.2f}s")
+    assert len(mst.edges()) == len(forest) and np.isclose(mst.total, w[forest].sum()), "boruvka and kruskal disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+CONTRACTION HIERARCHIES
+
+Preprocess a static grid map once so that shortest path queries only touch a few hundred nodes, instead of
+the large region Dijkstra's algorithm floods on the same map.
+
+The graph is the one Point.update_neighbors implies: every open cell is a node, joined to its open
+DOWN/UP/RIGHT/LEFT neighbours by edges of weight 1.
+
+HOW IT WORKS:
+- Build: contract the nodes one by one, least important first (fewest shortcuts added, fewest neighbours already
+  contracted). Contracting v removes it from the graph. For every pair of its remaining neighbours u, w whose
+  shortest connection ran through v, a shortcut u - w is added, remembering v as its middle node.
+- The order a node was contracted in is its rank. Every edge, original or shortcut, is stored once, at its
+  lower ranked end, pointing upwards.
+- Query: run Dijkstra from start and from end at the same time, both only climbing upward edges. The best
+  node where the two searches meet lies on a shortest path. Shortcuts on that path are expanded back into
+  their middle nodes to recover the cells.
+
+USAGE:
+    python ContractionHierarchies.py build map.txt map.ch
+    python ContractionHierarchies.py bench map.txt map.ch --queries 200
+"""
+
+import argparse
+import heapq
+import pickle
+import random
+import time
+from array import array
+
+from GridMap import load_map
+
+
+class ContractionHierarchy:
+    def __init__(self, rows, rank, up_offsets, up_targets, up_weights, middles):
+        self.rows = rows
+        self.rank = rank # contraction order of each cell, -1 for barriers
+        self.up_offsets = up_offsets # upward edges of node v are up_targets/up_weights[up_offsets[v]:up_offsets[v + 1]]
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.middles = middles # (lower node, higher node) -> middle node of that shortcut
+
+    def upward(self, v):
+        begin, end = self.up_offsets[v], self.up_offsets[v + 1]
+        return zip(self.up_targets[begin:end], self.up_weights[begin:end])
+
+    def distance_and_meeting(self, source, target):
+        dist = ({source: 0}, {target: 0})
+        parent = ({source: None}, {target: None})
+        heaps = ([(0, source)], [(0, target)])
+        best, meeting = float("inf"), None
+
+        while heaps[0] or heaps[1]:
+            # the search whose frontier is lower goes next. Once both frontiers reach best, nothing can improve it
+            side = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            d, v = heapq.heappop(heaps[side])
+            if d >= best:
+                if not heaps[1 - side] or heaps[1 - side][0][0] >= best:
+                    break
+                heaps[side].clear()
+                continue
+            if d > dist[side][v]: # stale entry
+                continue
+
+            other = dist[1 - side].get(v)
+            if other is not None and d + other < best:
+                best, meeting = d + other, v
+
+            for w, weight in self.upward(v):
+                nd = d + weight
+                if nd < dist[side].get(w, float("inf")):
+                    dist[side][w] = nd
+                    parent[side][w] = v
+                    heapq.heappush(heaps[side], (nd, w))
+
+        return best, meeting, parent
+
+    def unpack(self, a, b, path):
+        """
+        Append the cells of edge a -> b, without a, to path, expanding shortcuts recursively.
+        """
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            middle = self.middles.get((a, b) if self.rank[a] < self.rank[b] else (b, a))
+            if middle is None:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def query(self, start, end):
+        """
+        Shortest path between two (row, col) cells as a list of (row, col) cells, or None if there is none.
+        """
+        source = start[0] * self.rows + start[1]
+        target = end[0] * self.rows + end[1]
+        if self.rank[source] < 0 or self.rank[target] < 0:
+            return None
+        if source == target:
+            return [start]
+
+        best, meeting, parent = self.distance_and_meeting(source, target)
+        if meeting is None:
+            return None
+
+        up_chain = [meeting] # start ... meeting, climbed by the forward search
+        while parent[0][up_chain[-1]] is not None:
+            up_chain.append(parent[0][up_chain[-1]])
+        up_chain.reverse()
+        down_chain = [meeting] # meeting ... end, climbed backwards from end
+        while parent[1][down_chain[-1]] is not None:
+            down_chain.append(parent[1][down_chain[-1]])
+
+        nodes = [source]
+        chain = up_chain + down_chain[1:]
+        for a, b in zip(chain, chain[1:]):
+            self.unpack(a, b, nodes)
+        return [divmod(v, self.rows) for v in nodes]
+
+    def distance(self, start, end):
+        source = start[0] * self.rows + start[1]
+        target = end[0] * self.rows + end[1]
+        if self.rank[source] < 0 or self.rank[target] < 0:
+            return None
+        best = self.distance_and_meeting(source, target)[0]
+        return None if best == float("inf") else best
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            keys = array("i")
+            values = array("i")
+            for (a, b), middle in self.middles.items():
+                keys.extend((a, b))
+                values.append(middle)
+            pickle.dump({
+                "rows": self.rows,
+                "rank": self.rank,
+                "up_offsets": self.up_offsets,
+                "up_targets": self.up_targets,
+                "up_weights": self.up_weights,
+                "middle_keys": keys,
+                "middle_values": values,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "rb") as f:
+            data = pickle.load(f)
+        keys = data["middle_keys"]
+        middles = {(keys[2 * i], keys[2 * i + 1]): middle for i, middle in enumerate(data["middle_values"])}
+        return cls(data["rows"], data["rank"], data["up_offsets"], data["up_targets"], data["up_weights"], middles)
+
+
+def witness_search(adj, source, skip, limit, max_settled):
+    """
+    Bounded Dijkstra from source that ignores node skip. Returns the distances it settled within limit.
+    """
+    dist = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+    while heap and settled < max_settled:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        for w, weight in adj[v].items():
+            nd = d + weight
+            if w != skip and nd < dist.get(w, float("inf")):
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+
+def find_shortcuts(adj, v, max_settled):
+    """
+    Shortcuts needed if v were contracted now, as (u, w, weight) with u < w.
+    """
+    neighbors = list(adj[v].items())
+    shortcuts = []
+    for i, (u, du) in enumerate(neighbors[:-1]):
+        targets = neighbors[i + 1:]
+        limit = du + max(dw for _, dw in targets)
+        dist = witness_search(adj, u, v, limit, max_settled)
+        for w, dw in targets:
+            if dist.get(w, float("inf")) > du + dw: # no path around v that is as short
+                shortcuts.append((min(u, w), max(u, w), du + dw))
+    return shortcuts
+
+
+def build(grid, max_settled=60):
+    """
+    Contract every open cell of a GridMap and return its ContractionHierarchy.
+    max_settled bounds each witness search: lower is a faster build, at the price of some unneeded shortcuts.
+    """
+    rows = grid.rows
+    n = rows * rows
+    # nodes are numbered row * rows + col whatever order the grid keeps its cells in (a TiledGridMap does not
+    # go row by row), so queries map (row, col) to a node without the grid
+    def node(cell):
+        row, col = grid.pos(cell)
+        return row * rows + col
+
+    adj = [dict() for _ in range(n)] # node -> {neighbour: weight}, for the nodes not contracted yet
+    is_open = bytearray(n)
+    for cell in range(len(grid.barriers)):
+        if not grid.barriers[cell]:
+            v = node(cell)
+            is_open[v] = 1
+            for w in grid.neighbors(cell):
+                adj[v][node(w)] = 1
+
+    deleted = [0] * n # contracted neighbours of each node, keeps contraction spread across the map
+
+    def priority(v):
+        return len(find_shortcuts(adj, v, max_settled)) - len(adj[v]) + deleted[v]
+
+    heap = [(priority(v), v) for v in range(n) if is_open[v]]
+    heapq.heapify(heap)
+
+    rank = array("i", [-1] * n)
+    up = [None] * n
+    middles = {}
+    order = 0
+    while heap:
+        p, v = heapq.heappop(heap)
+        current = priority(v) # lazy update: priorities drift as the graph changes around v
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        for u, w, weight in find_shortcuts(adj, v, max_settled):
+            if weight < adj[u].get(w, float("inf")):
+                adj[u][w] = adj[w][u] = weight
+                middles[(u, w)] = v # keyed by node id for now, re-keyed by rank once the order is known
+
+        rank[v] = order
+        order += 1
+        up[v] = list(adj[v].items()) # every remaining neighbour is contracted later, so these edges point up
+        for u in adj[v]:
+            del adj[u][v]
+            deleted[u] += 1
+        adj[v] = {}
+
+    up_offsets = array("i", [0])
+    up_targets = array("i")
+    up_weights = array("i")
+    for v in range(n):
+        for w, weight in up[v] or ():
+            up_targets.append(w)
+            up_weights.append(weight)
+        up_offsets.append(len(up_targets))
+
+    ranked_middles = {}
+    for (u, w), middle in middles.items():
+        ranked_middles[(u, w) if rank[u] < rank[w] else (w, u)] = middle
+    return ContractionHierarchy(grid.rows, rank, up_offsets, up_targets, up_weights, ranked_middles)
+
+
+def bench(grid, ch, queries=200, seed=None):
+    """
+    Compare query times with Dijkstra.shortest_path on the same map and check both agree on distances.
+    """
+    import Dijkstra
+
+    cells = grid.apply(Dijkstra.make_cells(grid.rows, grid.rows))
+    for row in cells:
+        for point in row:
+            point.update_neighbors(cells)
+
+    rng = random.Random(seed)
+    open_cells = [grid.pos(v) for v in range(len(grid.barriers)) if not grid.barriers[v]]
+    pairs = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(queries)]
+
+    began = time.perf_counter()
+    expected = [Dijkstra.shortest_path(cells, cells[s[0]][s[1]], cells[e[0]][e[1]]) for s, e in pairs]
+    dijkstra_time = time.perf_counter() - began
+
+    began = time.perf_counter()
+    got = [ch.query(s, e) for s, e in pairs]
+    ch_time = time.perf_counter() - began
+
+    for a, b in zip(expected, got):
+        assert (a is None) == (b is None) and (a is None or len(a) == len(b)), "CH disagrees with Dijkstra"
+    print(f"dijkstra: {1000 * dijkstra_time / queries:.3f} ms/query")
+    print(f"CH:       {1000 * ch_time / queries:.3f} ms/query ({dijkstra_time / ch_time:.0f}x faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contraction Hierarchies over a grid map.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="preprocess a map and save the hierarchy")
+    build_parser.add_argument("map_file")
+    build_parser.add_argument("ch_file")
+    build_parser.add_argument("--max-settled", type=int, default=60)
+    bench_parser = sub.add_parser("bench", help="time queries against Dijkstra's algorithm")
+    bench_parser.add_argument("map_file")
+    bench_parser.add_argument("ch_file")
+    bench_parser.add_argument("--queries", type=int, default=200)
+    bench_parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    grid = load_map(args.map_file)
+    if args.command == "build":
+        began = time.perf_counter()
+        ch = build(grid, args.max_settled)
+        ch.save(args.ch_file)
+        print(f"built {args.ch_file} in {time.perf_counter() - began:.1f}s "
+              f"({len(ch.up_targets)} upward edges, {len(ch.middles)} shortcuts)")
+    else:
+        bench(grid, ContractionHierarchy.load(args.ch_file), args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,18 @@ Reference: Tech with Tim A* Tutorial on youtube.
 
 import pygame
 import math
+import heapq
 from queue import PriorityQueue
 
+from BitFlood import FloodComponents
+from GridMap import Components, GridMap, LazyCells
+from PathCodec import encode_path
+from SolverThread import SolverThread
+from Viewport import ObstaclePyramid, Viewport
+
 WIDTH = 800 # the width of our square map
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("Dijkstra Shortest Path Algorithm")
+FPS = 60 # frame cap of the main loop
+LABEL_ROWS = 256 # the GUI keeps a Components index up to this many rows, larger maps flood per query instead
 
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
@@ -111,22 +118,20 @@ def reconstruct_path(came_from, current, draw): # This function helps visualize
 
 # DEFINE THE Dijkstra's ALGORITHM
 
-def algorithm(draw, cells, start, end):
+def algorithm(draw, cells, start, end, components=None):
+    if components is not None and not components.connected(start, end):
+        return False # end is walled off from start, so don't flood the whole reachable region
+
     count = 0 # count is to keep track of the order in which things are added to the queue
     open_set = PriorityQueue() # gives us the node with lowest g. If lowest g repeated, then lowest count!
     open_set.put((0, count, start)) # add the start node with it's g score, and count, into the priority queue
     came_from = {} # from what node, did a node come from
-    g_score = {point: float("inf") for row in cells for point in row} # assume inf g scores for all the nodes except start node
-    g_score[start] = 0
+    g_score = {start: 0} # only cells we touched get a g score, missing cells count as inf
     
 
     open_set_hash = {start} # this helps us know which items are in the priority queue and not in the priority queue
 
     while not open_set.empty(): # if we haven't gone through all the nodes yet
-        for event in pygame.event.get(): # helps us quit the algorithm if we wish
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
         current = open_set.get()[2] # current node/point we are looking at = node with the lowest g score
         open_set_hash.remove(current) # to remove the node with the lowest g score. If same g scores, choose the lowest count!
 
@@ -136,10 +141,11 @@ def algorithm(draw, cells, start, end):
             start.make_start()
             return True
 
+        current.update_neighbors(cells) # linked when expanded, so only the cells the search reaches get a Point
         for neighbor in current.neighbors:
             temp_g_score = g_score[current] + 1 # g score of neighbor nodes = g score of node + 1
 
-            if temp_g_score < g_score[neighbor]: # update g score of a node only if its new g score is lower than the previous one
+            if temp_g_score < g_score.get(neighbor, float("inf")): # update g score of a node only if its new g score is lower than the previous one
                 came_from[neighbor] = current
                 g_score[neighbor] = temp_g_score
                 if neighbor not in open_set_hash: # add neighbor node to open set hash if neighbor was not visited previously
@@ -156,6 +162,128 @@ def algorithm(draw, cells, start, end):
     return False # if we did not find a path!
 
 
+# the same search without the GUI: nothing is drawn or recolored, and the path is returned instead.
+# It returns the (row, col) cells from start to end, or None if there is no path.
+# With compact=True the path comes back run-length encoded as bytes (see PathCodec.py), to cache or send it cheaply.
+# Call update_neighbors on every cell before searching, as PathServer does (main links cells as it expands them).
+
+def shortest_path(cells, start, end, components=None, compact=False):
+    if components is not None and not components.connected(start, end):
+        return None
+
+    count = 0
+    open_set = [(0, count, start)] # a plain heap: no locking needed outside the GUI thread
+    came_from = {}
+    g_score = {start: 0} # only cells we touched get a score, missing cells count as inf
+    closed = set()
+
+    while open_set:
+        current = heapq.heappop(open_set)[2]
+        if current in closed: # stale entry, this cell was already expanded with a lower score
+            continue
+        closed.add(current)
+
+        if current == end:
+            path = [(end.row, end.col)]
+            while current in came_from:
+                current = came_from[current]
+                path.append((current.row, current.col))
+            path.reverse()
+            return encode_path(path) if compact else path
+
+        for neighbor in current.neighbors:
+            temp_g_score = g_score[current] + 1
+            if temp_g_score < g_score.get(neighbor, float("inf")):
+                came_from[neighbor] = current
+                g_score[neighbor] = temp_g_score
+                count += 1
+                heapq.heappush(open_set, (g_score[neighbor], count, neighbor))
+
+    return None
+
+
+
+# NEAREST OF MANY GOALS
+# One search from all the starts at once (each start begins with g score 0) that stops as soon as any goal is
+# expanded. Dijkstra's algorithm expands cells in order of distance, so that goal is the nearest one, and the
+# path runs from the nearest start to it. Replaces one query per goal, e.g. "the closest of 500 charging stations".
+# starts is one cell or a list of cells, goals is a list (or set) of cells. Returns (row, col) cells, or None.
+
+def nearest_goal(cells, starts, goals, components=None):
+    if hasattr(starts, "row"): # a single cell, from any cell grid (make_cells of either module, LazyCells)
+        starts = [starts]
+    goals = set(goals)
+    if components is not None: # only goals that some start can reach; none at all means no search
+        goals = {goal for goal in goals if any(components.connected(start, goal) for start in starts)}
+    if not goals or not starts:
+        return None
+
+    count = 0
+    open_set = []
+    came_from = {}
+    g_score = {}
+    for start in starts:
+        g_score[start] = 0
+        count += 1
+        open_set.append((0, count, start))
+    closed = set()
+
+    while open_set:
+        current = heapq.heappop(open_set)[2]
+        if current in closed:
+            continue
+        closed.add(current)
+
+        if current in goals:
+            path = [(current.row, current.col)]
+            while current in came_from:
+                current = came_from[current]
+                path.append((current.row, current.col))
+            path.reverse()
+            return path
+
+        for neighbor in current.neighbors:
+            temp_g_score = g_score[current] + 1
+            if temp_g_score < g_score.get(neighbor, float("inf")):
+                came_from[neighbor] = current
+                g_score[neighbor] = temp_g_score
+                count += 1
+                heapq.heappush(open_set, (g_score[neighbor], count, neighbor))
+
+    return None
+
+
+# GRID VORONOI PARTITION
+# The same multi-source search, run until every reachable cell is expanded. Every cell is labelled with the
+# index of its nearest source in sources and its distance to it; ties go to the source listed first.
+# Returns (nearest, distance), both indexed [row][col]: nearest is -1 and distance is inf for barriers and for
+# cells no source can reach.
+
+def voronoi(cells, sources):
+    rows = len(cells)
+    nearest = [[-1] * rows for _ in range(rows)]
+    distance = [[float("inf")] * rows for _ in range(rows)]
+
+    open_set = []
+    for i, source in enumerate(sources):
+        if nearest[source.row][source.col] == -1: # a cell listed twice belongs to the first source
+            nearest[source.row][source.col] = i
+            distance[source.row][source.col] = 0
+            open_set.append((0, i, source.row, source.col))
+    heapq.heapify(open_set) # keyed (g score, source): equally far cells are claimed by the lower source first
+
+    while open_set:
+        g, i, row, col = heapq.heappop(open_set)
+        if g > distance[row][col]: # stale entry
+            continue
+        for neighbor in cells[row][col].neighbors:
+            if g + 1 < distance[neighbor.row][neighbor.col]:
+                distance[neighbor.row][neighbor.col] = g + 1
+                nearest[neighbor.row][neighbor.col] = i
+                heapq.heappush(open_set, (g + 1, i, neighbor.row, neighbor.col))
+
+    return nearest, distance
+
 
 # define a function to define each cell within the grid map. Width here is map width
 # each cell inside cells is an instance of the class Point
@@ -172,62 +300,73 @@ def make_cells(rows, width):
     return cells
 
 
-# define a function to draw the grid lines inside the grid map. Width here is the map width
-
-def draw_grid(win, rows, width):
-    increment = width // rows
-    for i in range(rows):
-        pygame.draw.line(win, GREY, (0, i * increment), (width, i * increment))
-    for j in range(rows):
-        pygame.draw.line(win, GREY, (j * increment, 0), (j * increment, width))
-
 # for the following function, assume that we already know which row, and which point (node) inside the row.
-# Note that the point is an instance of Point, based on the position of the point 
-# Then we can say the following
-
-def draw(win, cells, rows, width):
-    win.fill(WHITE)
-    for row in cells:
-        for point in row:
-            point.draw(win)
+# Only the part of the map inside the viewport is drawn, see Viewport.py. markers stay visible when zoomed out
 
-    draw_grid(win, rows, width)
+def draw(win, cells, view, pyramid, markers=()):
+    view.render(win, cells, pyramid, markers)
     pygame.display.update()
 
-# A function to find the cell position of the point clicked by the user
+###
 
-def get_clicked_pose(pos, rows, width):
-    increment = width // rows
-    y, x = pos
-    
-    row = y // increment
-    col = x // increment
+def main(win, width, rows=50, grid=None): # grid is a GridMap to start from, instead of an empty map
+    ROWS = grid.rows if grid else rows
 
-    return row, col
+    base = grid or GridMap(ROWS)
 
-###
+    def fresh_cells(): # Points are only made for the cells that are drawn, clicked or searched, see LazyCells
+        work = GridMap(ROWS, base.barriers) # barrier edits of a large map land here, base stays as it was loaded
+        cells = LazyCells(work, lambda row, col: Point(row, col, width // ROWS, ROWS))
+        # labelling every cell needs every Point, so large maps check reachability with one flood per query
+        components = Components(cells) if ROWS <= LABEL_ROWS else FloodComponents(work)
+        return cells, components
 
-def main(win, width):
-    ROWS = 50
-    cells = make_cells(ROWS, width)
+    cells, components = fresh_cells()
+    view = Viewport(ROWS, width)
+    pyramid = ObstaclePyramid.from_grid(base)
 
     start = None # keep track on the start and end position
     end = None
 
+    clock = pygame.time.Clock()
+    solver = None # the search, running on its own thread so the window stays responsive
+    dirty = True # only redraw when something changed
     run = True # know if you started the main loop
     started = False # know if you started the algorithm
     while run:
-        draw(win, cells, ROWS, width)
-        for event in pygame.event.get():
+        if started and not solver.is_alive(): # finished, or cancelled
+            if solver.error is not None:
+                raise solver.error
+            started = False
+            solver = None
+            dirty = True
+
+        if dirty or started: # while searching, show its progress at the frame rate
+            draw(win, cells, view, pyramid, (start, end))
+            dirty = False
+        clock.tick(FPS)
+
+        # when idle, sleep until something happens instead of spinning
+        events = pygame.event.get() if started else [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
 
-            if started:
-                continue # user should not be able to change stuff while the algorithm is running
+            if view.handle(event): # zoom and pan
+                dirty = True
+                continue
+
+            if started: # user should not be able to change stuff while the algorithm is running
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_c):
+                    solver.cancel() # Press escape (or c) to stop the search
+                continue
 
-            if pygame.mouse.get_pressed()[0]: # Left mouse button
-                pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pose(pos, ROWS, width)
+            if event.type != pygame.MOUSEMOTION or any(event.buttons): # plain mouse moves change nothing
+                dirty = True
+
+            clicked = view.cell_at(pygame.mouse.get_pos()) # clicks go through the zoom and pan of the view
+            if clicked and pygame.mouse.get_pressed()[0]: # Left mouse button
+                row, col = clicked
                 point = cells[row][col]
                 if not start and point != end: # define the start position if it hasn't been done yet
                     start = point
@@ -239,12 +378,15 @@ def main(win, width):
 
                 elif point != end and point != start: # the remaining blocks we click are the obstacles
                     point.make_barrier()
+                    components.add_barrier(point)
+                    pyramid.set_barrier(row, col)
 
-            elif pygame.mouse.get_pressed()[2]: # Right mouse button
-                pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pose(pos, ROWS, width)
+            elif clicked and pygame.mouse.get_pressed()[2]: # Right mouse button
+                row, col = clicked
                 point = cells[row][col]
                 point.reset() 
+                components.remove_barrier(point)
+                pyramid.set_barrier(row, col, False)
                 if point == start: # basically, you can reset the start and end point by right clicking
                     start == None
                 elif point == end:
@@ -252,18 +394,34 @@ def main(win, width):
                 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE and start and end:
-                    for row in cells:
-                        for point in row:
-                            point.update_neighbors(cells)
-
-                    algorithm(lambda: draw(win, cells, ROWS, width), cells, start, end)
+                    # the search reports each step; that is where it notices it was cancelled
+                    solver = SolverThread(lambda report: algorithm(report, cells, start, end, components))
+                    solver.start()
+                    started = True
 
-                if event.key == pygame.K_c: # Press c to clear screen
+                if event.key == pygame.K_c: # Press c to clear screen, back to the map we started from
                     start = None
                     end = None
-                    cells = make_cells(ROWS, width)
-            
-    pygame.quit()
+                    cells, components = fresh_cells()
+                    pyramid = ObstaclePyramid.from_grid(base)
 
-main(WIN, WIDTH)
+    if solver is not None:
+        solver.cancel()
+        solver.join()
+    pygame.quit()
 
+# only open the window when run as a script, so the search functions can be imported headless
+
+if __name__ == "__main__":
+    import sys
+    from GridMap import load_map
+
+    rows, grid = 50, None
+    if len(sys.argv) > 1: # python Dijkstra.py [rows | map file]
+        if sys.argv[1].isdigit():
+            rows = int(sys.argv[1])
+        else:
+            grid = load_map(sys.argv[1])
+    WIN = pygame.display.set_mode((WIDTH, WIDTH))
+    pygame.display.set_caption("Dijkstra Shortest Path Algorithm")
+    main(WIN, WIDTH, rows, grid)
@@ -5,6 +5,7 @@ INSTRUCTIONS:
 - Right-click to place a **vehicle depot** (black).
 - Left-click to place a **target node** (red).
 - Press **SPACEBAR** to generate Eulerian tours.
+- Press **1-4** to pick the tour engine: Euler walk, shortcut double tree, Christofides, local search.
 - Press **C** to clear the grid and try again.
 
 FEATURES:
@@ -15,11 +16,14 @@ FEATURES:
 
 import pygame
 import math
+import time
+import numpy as np
 from collections import defaultdict
 
+from SolverThread import SolverThread
+
 WIDTH = 800 # the width of our square map
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("EULERIAN TOUR EXPLORER")
+FPS = 60 # frame cap of the main loop
 
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
@@ -97,162 +101,424 @@ def get_clicked_pose(pos, rows, width):
     return row, col
 
 
-def gen_obj_edges(obj_nodes, node_type):
+def tour_overlay(coords, tours, width, shift=3, arrow_length=10, arrow_angle=math.radians(30)):
     """
-    Given a list of nodes (point objects), generate the list of undirected edges for the complete graph.
+    Draw the tours once onto a transparent width x width surface, which the main loop then blits every frame.
+    coords are the pixel centres of the nodes (node_coords), tours the node index arrays from solve_tours.
+    An edge into a node visited for the first time is a forward edge (black, shifted up), any other edge returns
+    to a node already visited (green, shifted down). All the geometry is computed with NumPy, one tour at a time.
     """
-    obj_edges = []
-    for i in range(len(obj_nodes)):
-        for j in range(i+1, len(obj_nodes)): # only upper triangle of the matrix
-            u, v = obj_nodes[i], obj_nodes[j]
-            if node_type[i] == 1 and node_type[j] == 1: # both are vehicle nodes
-                weight = 0
-            else:
-                x1 = u.x + u.width/2
-                y1 = u.y + u.width/2
-                x2 = v.x + v.width/2
-                y2 = v.y + v.width/2
-                weight = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
-            obj_edges.append([u, v, weight])
-    return obj_edges
+    overlay = pygame.Surface((width, width), pygame.SRCALPHA)
+    for tour in tours:
+        tour = np.asarray(tour)
+        if len(tour) < 2:
+            continue
+        first = np.zeros(len(tour), dtype=bool) # the starting node counts as visited, so position 0 is skipped
+        first[np.unique(tour, return_index=True)[1]] = True
+        forward = first[1:]
+
+        offset = np.where(forward, -shift, shift)
+        tail = coords[tour[:-1]].copy()
+        tip = coords[tour[1:]].copy()
+        tail[:, 1] += offset
+        tip[:, 1] += offset
+
+        angle = np.arctan2(tip[:, 1] - tail[:, 1], tip[:, 0] - tail[:, 0])[:, None]
+        left = tip - arrow_length * np.hstack((np.cos(angle - arrow_angle), np.sin(angle - arrow_angle)))
+        right = tip - arrow_length * np.hstack((np.cos(angle + arrow_angle), np.sin(angle + arrow_angle)))
+
+        for a, b, l, r, f in zip(tail.tolist(), tip.tolist(), left.tolist(), right.tolist(), forward.tolist()):
+            color = BLACK if f else GREEN
+            pygame.draw.polygon(overlay, color, [b, l, r])
+            pygame.draw.line(overlay, color, a, b, width=3)
+    return overlay
+
+
+def prim_parents(coords, node_type):
+    """
+    Dense Prim's algorithm on the complete graph over coords (an n x 2 array of cell centres), where two
+    vehicle nodes are joined at zero weight, so the vehicles act as one root. Edges are never materialized: each
+    step computes one row of distances on the fly, so memory is O(n) instead of O(n^2).
+    Returns (parent, weight): tree node i hangs off parent[i] with edge weight weight[i]; the root has parent -1.
+    """
+    n = len(coords)
+    vehicle = np.asarray(node_type, dtype=bool)
+    key = np.full(n, np.inf) # cheapest known edge from the tree to each node
+    parent = np.full(n, -1, dtype=np.int64)
+    weight = np.zeros(n)
+    in_tree = np.zeros(n, dtype=bool)
+    if n == 0:
+        return parent, weight
+
+    key[0] = 0
+    for _ in range(n):
+        u = int(np.argmin(np.where(in_tree, np.inf, key)))
+        in_tree[u] = True
+        weight[u] = key[u]
+
+        dist = np.hypot(coords[:, 0] - coords[u, 0], coords[:, 1] - coords[u, 1])
+        if vehicle[u]:
+            dist[vehicle] = 0 # vehicle to vehicle is free
+        closer = ~in_tree & (dist < key)
+        key[closer] = dist[closer]
+        parent[closer] = u
+
+    return parent, weight
+
+
+def node_coords(obj_nodes):
+    """
+    Cell centres of a list of point objects, as an n x 2 array.
+    """
+    return np.array([(u.x + u.width/2, u.y + u.width/2) for u in obj_nodes], dtype=float).reshape(-1, 2)
 
 
-def min_spanning_tree(obj_nodes, obj_edges):
+def split_tree(parent, node_type):
+    """
+    Adjacency of the spanning tree from prim_parents without its vehicle-vehicle edges, which leaves one
+    subtree per vehicle. Returned in CSR form: the neighbours of node i are targets[offsets[i]:offsets[i + 1]].
+    Built with a counting pass over the n - 1 tree edges instead of removing edges from lists.
     """
-    Given a graph, return Kruskal's Minimum Weight Spanning Tree for that graph.
+    n = len(parent)
+    vehicle = np.asarray(node_type, dtype=bool)
+    child = np.nonzero(parent >= 0)[0]
+    up = parent[child]
+    keep = ~(vehicle[child] & vehicle[up])
+    child, up = child[keep], up[keep]
+
+    sources = np.concatenate((child, up)) # both directions of every kept edge
+    targets = np.concatenate((up, child))
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return offsets, targets[order]
+
+
+def extract_tours(parent, node_type):
     """
+    Eulerian tours (double-tree walks, every tree edge driven down and back up) for every vehicle, from a single
+    pass over the spanning tree: O(n) in total, however many vehicles there are. Each tour is an array of node
+    indices that starts and ends at its vehicle. Vehicles come in node order.
+    """
+    offsets, targets = split_tree(parent, node_type)
+    offsets, targets = offsets.tolist(), targets.tolist() # plain lists index faster in the loop below
+    visited = bytearray(len(parent))
+    cursor = offsets[:-1] # next neighbour to look at, per node
+
+    tours = []
+    for vehicle in np.nonzero(np.asarray(node_type, dtype=bool))[0].tolist():
+        tour = [vehicle]
+        visited[vehicle] = 1
+        stack = [vehicle]
+        while stack:
+            node = stack[-1]
+            if cursor[node] < offsets[node + 1]:
+                neighbor = targets[cursor[node]]
+                cursor[node] += 1
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    tour.append(neighbor)
+                    stack.append(neighbor)
+            else:
+                stack.pop()
+                if stack:
+                    tour.append(stack[-1]) # walk back up the edge we came down
+        tours.append(np.array(tour, dtype=np.int64))
+    return tours
 
-    parent = {node: node for node in obj_nodes}
-    rank = {node: 0 for node in obj_nodes}
-    
-    def find(node):
-        """
-        Find function finds the group to which a node belongs. It does it by identifying the
-        representative (root) of the group the node belongs to. Two nodes belong to the
-        same group iff they are connected since they both are connected to the root. Hence, adding
-        an edge between such node pairs will lead to cycles.
-        """
-        if parent[node] != node:
-            parent[node] = find(parent[node]) # The assignment compresses path from node to root. Every node in the path finally points directly at root.
-        return parent[node]
-    
-    def union(node1, node2):
-        """
-        Union function combines two groups. It does this by placing the root of one
-        group as the child of the root of the other group.
-        
-        The 'rank' heuristic is used to keep the tree shallow by always attaching
-        the shorter tree under the root of the taller tree. Note that the rank of the root of
-        a tree represents an upper bound on the height of the tree and is used only to guide
-        efficient union operations; it may not always reflect the exact height of the tree.
-        """
-        root1 = find(node1)
-        root2 = find(node2)
-
-        if root1 == root2:
-            return
-
-        if rank[root1] < rank[root2]:
-            parent[root1] = root2
-
-        elif rank[root2] < rank[root1]:
-            parent[root2] = root1
 
-        else:
-            rank[root1] += 1
-            parent[root2] = root1
+# TOUR ENGINES
+# The double-tree walk visits targets twice and can be up to twice as long as the best tour. The engines below
+# trade compute for route quality; solve_tours picks one per request and reports length and runtime.
 
-    
-    mstree = []
-    obj_edges = sorted(obj_edges, key=lambda x: x[2])
-    for [u, v, w] in obj_edges:
-        if find(u) != find(v):
-            union(u, v)
-            mstree.append([u, v, w])
+TOUR_ENGINES = ("euler", "double_tree", "christofides", "local_search")
 
-    return mstree
 
+def distance(coords, a, b):
+    return math.hypot(coords[a, 0] - coords[b, 0], coords[a, 1] - coords[b, 1])
 
-def gen_adj_list(edges):
-    """
-    Get an adjacency list for a graph represented as a list of edges.
-    """
-    adj_lst = defaultdict(list)
-    for [u, v, w] in edges:
-        adj_lst[u].append(v)
-        adj_lst[v].append(u)
-    return adj_lst
 
+def tour_length(coords, tour):
+    if len(tour) < 2:
+        return 0.0
+    steps = np.diff(coords[tour], axis=0)
+    return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
 
-def dfs(root, adj_lst, path, visited):
+
+def shortcut(walk):
     """
-    Depth first search.
+    Skip the nodes a closed walk has already visited, and return to its start. By the triangle inequality the
+    tour is never longer than the walk. On a double-tree walk this gives the 2-approximate TSP tour.
     """
-    if root not in visited:
-        visited.add(root)
-        path.append(root)
-        for node in adj_lst[root]:
-            dfs(node, adj_lst, path, visited)
+    seen = set()
+    tour = []
+    for node in walk.tolist():
+        if node not in seen:
+            seen.add(node)
+            tour.append(node)
+    tour.append(tour[0])
+    return np.array(tour, dtype=np.int64)
 
 
-def eul_tour(root, adj_lst, tour_eul, visited):
+def christofides_tour(coords, offsets, targets, walk):
     """
-    Given a tree, use a DFS variant to obtain a double-edged walk that traverse all
-    nodes in the tree twice in opposite directions. Same as an Eulerian tour on the
-    tree if all its edges were doubled.
+    Christofides-style tour of the subtree a vehicle's walk covers: add a matching on the odd-degree nodes of
+    the subtree, follow an Eulerian circuit of the result and shortcut it. The matching is greedy (closest
+    pairs first) rather than minimum weight, which keeps it simple and fast but loosens the 1.5 bound.
     """
-    if root not in visited:
-        visited.add(root)
-        tour_eul.append(root)
-        for node in adj_lst[root]:
-            if node not in visited:
-                eul_tour(node, adj_lst, tour_eul, visited)
-                tour_eul.append(root)
+    nodes = shortcut(walk)[:-1] # the subtree, vehicle first
+    if len(nodes) <= 3:
+        return shortcut(walk)
+
+    edges = []
+    for node in nodes.tolist():
+        for neighbor in targets[offsets[node]:offsets[node + 1]].tolist():
+            if node < neighbor:
+                edges.append((node, neighbor))
+    odd = [node for node in nodes.tolist() if (offsets[node + 1] - offsets[node]) % 2]
+
+    points = coords[odd]
+    gaps = np.hypot(points[:, None, 0] - points[None, :, 0], points[:, None, 1] - points[None, :, 1])
+    first, second = np.triu_indices(len(odd), k=1)
+    matched = bytearray(len(odd))
+    for k in np.argsort(gaps[first, second], kind="stable").tolist():
+        i, j = first[k], second[k]
+        if not matched[i] and not matched[j]:
+            matched[i] = matched[j] = 1
+            edges.append((odd[i], odd[j]))
+
+    # Hierholzer's algorithm: every node now has even degree, so the edges form an Eulerian circuit
+    incident = defaultdict(list)
+    for e, (a, b) in enumerate(edges):
+        incident[a].append((b, e))
+        incident[b].append((a, e))
+    used = bytearray(len(edges))
+    stack = [int(nodes[0])]
+    circuit = []
+    while stack:
+        node = stack[-1]
+        while incident[node] and used[incident[node][-1][1]]:
+            incident[node].pop()
+        if incident[node]:
+            neighbor, e = incident[node].pop()
+            used[e] = 1
+            stack.append(neighbor)
+        else:
+            circuit.append(stack.pop())
+    return shortcut(np.array(circuit[::-1], dtype=np.int64))
 
 
-def find_veh_eul_tours(vehicles, adj_lst):
+def improve_tour(coords, tour, deadline, k=8, report=None):
     """
-    Return Eulerian tours for each vehicle by performing a DFS variant from each vehicle.
+    2-opt and Or-opt local search on a closed tour until no move improves it or the deadline passes.
+    Moves are only tried towards each node's k nearest neighbours, and nodes whose surroundings have not
+    changed since they last failed to improve are skipped (don't-look bits). report, if given, is called
+    with no arguments every few hundred nodes, so that a cancelled solve stops there.
     """
-    tours = list()
-    for vehicle in vehicles:
-        tour_eul = []
-        eul_tour(vehicle, adj_lst, tour_eul, set())
-        tours.append(tour_eul)
-    return tours
-
-
-def find_veh_tsp_tours(vehicles, adj_lst):
+    t = tour[:-1].tolist()
+    m = len(t)
+    if m < 5:
+        return tour
+    start = t[0]
+
+    points = coords[t]
+    near = {}
+    for i, node in enumerate(t): # neighbour lists, nearest first
+        gaps = np.hypot(points[:, 0] - points[i, 0], points[:, 1] - points[i, 1])
+        closest = np.argpartition(gaps, min(k, m - 1))[:k + 1]
+        closest = closest[np.argsort(gaps[closest], kind="stable")]
+        near[node] = [t[j] for j in closest.tolist() if j != i][:k]
+
+    pos = {node: i for i, node in enumerate(t)}
+    d = lambda a, b: distance(coords, a, b)
+    queue = list(t) # nodes whose don't-look bit is off
+    active = set(t)
+
+    def wake(*nodes):
+        for node in nodes:
+            if node not in active:
+                active.add(node)
+                queue.append(node)
+
+    def reverse(p, q): # 2-opt: remove edges after positions p and q, reconnect by reversing t[p + 1 .. q]
+        if p > q:
+            p, q = q, p
+        t[p + 1:q + 1] = t[p + 1:q + 1][::-1]
+        for i in range(p + 1, q + 1):
+            pos[t[i]] = i
+
+    def two_opt(a):
+        i = pos[a]
+        for step in (1, -1): # the edge to the successor, then the edge to the predecessor
+            b = t[(i + step) % m]
+            for c in near[a]:
+                gain = d(a, b) - d(a, c)
+                if gain <= 1e-9: # neighbours are sorted, so no closer c remains
+                    break
+                j = pos[c]
+                e = t[(j + step) % m]
+                if e == a or c == b:
+                    continue
+                if gain + d(c, e) - d(b, e) > 1e-9:
+                    if step == 1:
+                        reverse(i, j)
+                    else:
+                        reverse((i - 1) % m, (j - 1) % m)
+                    wake(a, b, c, e)
+                    return True
+        return False
+
+    def or_opt(a):
+        i = pos[a]
+        for length in (1, 2, 3):
+            if i + length >= m or m - length < 3:
+                break
+            segment = t[i:i + length]
+            prev, after = t[i - 1], t[(i + length) % m]
+            removed = d(prev, segment[0]) + d(segment[-1], after) - d(prev, after)
+            for c in near[segment[0]] + near[segment[-1]]:
+                j = pos[c]
+                if i <= j < i + length or c == prev:
+                    continue
+                e = t[(j + 1) % m]
+                if i <= (j + 1) % m < i + length:
+                    continue
+                forward = d(c, segment[0]) + d(segment[-1], e)
+                backward = d(c, segment[-1]) + d(segment[0], e)
+                if removed - min(forward, backward) + d(c, e) > 1e-9:
+                    if backward < forward:
+                        segment.reverse()
+                    rest = t[:i] + t[i + length:]
+                    at = rest.index(c) + 1
+                    t[:] = rest[:at] + segment + rest[at:]
+                    for p, node in enumerate(t):
+                        pos[node] = p
+                    wake(prev, after, c, e, *segment)
+                    return True
+        return False
+
+    tried = 0
+    while queue and time.perf_counter() < deadline:
+        tried += 1
+        if report is not None and tried % 256 == 0:
+            report()
+        a = queue.pop()
+        active.discard(a)
+        if two_opt(a) or or_opt(a):
+            wake(a)
+
+    i = pos[start] # the vehicle leads the tour again
+    return np.array(t[i:] + t[:i] + [start], dtype=np.int64)
+
+
+def solve_tours(coords, node_type, engine="double_tree", time_limit=1.0, report=None):
     """
-    Return TSP tours for each vehicle by performing a DFS from each vehicle.
+    Tours for every vehicle with the chosen engine, as arrays of node indices.
+    - euler: the double-tree walk of each vehicle's subtree, every tree edge driven both ways.
+    - double_tree: the same walk with already visited targets skipped.
+    - christofides: matching on the odd nodes of each subtree, Eulerian circuit, shortcut.
+    - local_search: christofides, then 2-opt/Or-opt until time_limit seconds have passed in total.
+    report, if given, is called with (stage, tours) after every stage and after each improved tour, e.g. the
+    report of a SolverThread, which also stops the solve there once it is cancelled.
+    Returns (tours, stats) with the total length and runtime in stats.
     """
-    tours = list()
-    for vehicle in vehicles:
-        tour_eul = []
-        dfs(vehicle, adj_lst, tour_eul, set())
-        tour_eul.append(tour_eul[0]) # return to start
-        tours.append(tour_eul)
-    return tours
+    if engine not in TOUR_ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {TOUR_ENGINES}")
+    report = report or (lambda snapshot=None: None)
+    began = time.perf_counter()
+    parent, _ = prim_parents(coords, node_type)
+    tours = extract_tours(parent, node_type)
+    report(("euler", tours))
+
+    if engine == "double_tree":
+        tours = [shortcut(walk) for walk in tours]
+        report(("double_tree", tours))
+    elif engine in ("christofides", "local_search"):
+        offsets, targets = split_tree(parent, node_type)
+        tours = [christofides_tour(coords, offsets, targets, walk) for walk in tours]
+        report(("christofides", tours))
+        if engine == "local_search":
+            deadline = began + time_limit
+            for i in range(len(tours)):
+                tours = tours[:i] + [improve_tour(coords, tours[i], deadline, report=report)] + tours[i + 1:]
+                report(("local_search", tours))
+
+    stats = {
+        "engine": engine,
+        "length": sum(tour_length(coords, tour) for tour in tours),
+        "runtime": time.perf_counter() - began,
+    }
+    return tours, stats
 
 
 def main(win, width):
     
     ROWS = 50
-    increment = width // ROWS
     cells = make_cells(ROWS, width)
 
     run = True # know if you started the main loop
     solved = False # is the problem solved yet?
     nodes = []
     binary = [] # keep track of whether a node is a vehicle node or target node
-    result = []
+    engine = "euler" # switch with the number keys, see TOUR_ENGINES
 
+    clock = pygame.time.Clock()
+    solver = None
+    overlay = None # the drawn tours, rebuilt only when they change
+    started = False # is a solve running?
+    dirty = True # only redraw when something changed
     while run:
-        draw(win, cells, ROWS, width)
-        for event in pygame.event.get():
+        if started and not solver.is_alive(): # the solve finished, or was cancelled
+            if solver.error is not None:
+                raise solver.error
+            if not solver.cancelled.is_set():
+                tours, stats = solver.result # node indices, one array per vehicle
+                pygame.display.set_caption(f"EULERIAN TOUR EXPLORER - {stats['engine']}: "
+                                           f"length {stats['length']:.0f}, {1000 * stats['runtime']:.1f} ms")
+                solved = True
+                overlay = None
+            else:
+                pygame.display.set_caption("EULERIAN TOUR EXPLORER")
+                solved = False # drop the tours of an unfinished stage
+                overlay = None
+            started = False
+            solver = None
+            dirty = True
+        elif started:
+            snapshot = solver.latest() # the newest stage the solver reported: show its tours until the next
+            if snapshot is not None:
+                stage, tours = snapshot
+                pygame.display.set_caption(f"EULERIAN TOUR EXPLORER - {engine}: solving, {stage} "
+                                           f"length {sum(tour_length(coords, tour) for tour in tours):.0f}")
+                solved = True
+                overlay = None
+                dirty = True
+
+        if dirty:
+            draw(win, cells, ROWS, width)
+            if solved: # the tours were drawn once into an overlay, so showing them is a single blit
+                if overlay is None:
+                    overlay = tour_overlay(node_coords(nodes), tours, width)
+                win.blit(overlay, (0, 0))
+
+            pygame.display.flip()
+            dirty = False
+        clock.tick(FPS)
+
+        # when idle, sleep until something happens instead of spinning
+        events = pygame.event.get() if started else [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
 
+            if started: # nothing changes while the tours are being solved
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_c):
+                    solver.cancel() # Press escape (or c) to drop the running solve
+                continue
+
+            if event.type != pygame.MOUSEMOTION or any(event.buttons): # plain mouse moves change nothing
+                dirty = True
+
             if event.type == pygame.MOUSEBUTTONDOWN: 
                 mouse_presses = pygame.mouse.get_pressed()
                 pos = pygame.mouse.get_pos()
@@ -270,106 +536,32 @@ def main(win, width):
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
+                    # solved on a worker thread, so the window keeps answering during the local search
+                    coords, node_type, chosen = node_coords(nodes), list(binary), engine
+                    solver = SolverThread(lambda report: solve_tours(coords, node_type, chosen, report=report))
+                    solver.start()
+                    started = True
+                    pygame.display.set_caption(f"EULERIAN TOUR EXPLORER - {engine}: solving...")
                     
-                    def fix_adjacency_list(adjlist, binary):
-                        """
-                        Removes edges between vehicle nodes from the adjacency list.
-                        """
-                        node_to_index = {nodes[i]: i for i in range(len(nodes))}
-                        for i in range(len(binary)):
-                            if binary[i] == 1: # ith node is a vehicle
-                                vi = nodes[i]
-                                for node in adjlist[vi][:]:  # Iterate over a copy to avoid issues during removal
-                                    if binary[node_to_index[node]] == 1:
-                                        adjlist[vi].remove(node)
-                                        adjlist[node].remove(vi)  # Ensure undirected edge is removed both ways
-                        return adjlist
-                    
-                    vehicles = set()
-                    for i in range(len(binary)):
-                        if binary[i] == 1:
-                            vehicles.add(nodes[i])
-
-                    edges = gen_obj_edges(nodes, binary)
-                    mstree = min_spanning_tree(nodes, edges)
-                    adjlist = gen_adj_list(mstree)
-                    adjlist = fix_adjacency_list(adjlist, binary)
-                    tours = find_veh_eul_tours(vehicles, adjlist)
-                    # tours = find_veh_tsp_tours(vehicles, adjlist)
-                    
-                    result.clear()
-                    for tour in tours:
-                        for i in range(1, len(tour)):
-                            result.append((tour[i - 1], tour[i]))
-                    solved = True
-                    
+
+                if pygame.K_1 <= event.key < pygame.K_1 + len(TOUR_ENGINES): # 1-4 pick the tour engine
+                    engine = TOUR_ENGINES[event.key - pygame.K_1]
 
                 if event.key == pygame.K_c: # Press c to clear screen
                     cells = make_cells(ROWS, width)
                     nodes.clear()
                     binary.clear()
-                    result.clear()
                     solved = False
-                    
-        if not solved: # if not solved yet, do not display result
-            pass
-                
-        else:
-            shift_amount = 3  # pixels to shift up/down
-
-            for tour in tours:
-                visited_nodes = set()
-                visited_nodes.add(tour[0])  # Mark starting node as visited
-
-                for i in range(1, len(tour)):
-                    u = tour[i - 1]
-                    v = tour[i]
-
-                    x1 = u.x + (increment // 2)
-                    y1 = u.y + (increment // 2)
-                    x2 = v.x + (increment // 2)
-                    y2 = v.y + (increment // 2)
-
-                    # Check if edge is forward or backward
-                    if v not in visited_nodes:
-                        color = BLACK  # forward edge
-                        visited_nodes.add(v)
-                        y_shift = -shift_amount  # shift up
-                    else:
-                        color = GREEN  # backward edge
-                        y_shift = shift_amount  # shift down
-
-                    # Apply vertical shift to both points
-                    start = (x1, y1 + y_shift)
-                    end = (x2, y2 + y_shift)
-
-                    # Draw arrowhead
-                    arrow_length = 10  # length of the arrowhead line
-                    arrow_angle = math.radians(30)  # angle between arrowhead lines
-
-                    # Direction vector of the edge
-                    dx = x2 - x1
-                    dy = (y2 + y_shift) - (y1 + y_shift)
-                    angle = math.atan2(dy, dx)
-
-                    # Arrowhead points
-                    arrow_tip = (x2, y2 + y_shift)
-                    left_arrow = (
-                        x2 - arrow_length * math.cos(angle - arrow_angle),
-                        (y2 + y_shift) - arrow_length * math.sin(angle - arrow_angle)
-                    )
-                    right_arrow = (
-                        x2 - arrow_length * math.cos(angle + arrow_angle),
-                        (y2 + y_shift) - arrow_length * math.sin(angle + arrow_angle)
-                    )
-
-                    # Draw arrowhead as a filled triangle
-                    pygame.draw.polygon(win, color, [arrow_tip, left_arrow, right_arrow])
-                    
-                    pygame.draw.line(win, color, start, end, width=3)
+                    overlay = None
 
-        pygame.display.flip()
-            
+    if solver is not None:
+        solver.cancel()
+        solver.join()
     pygame.quit()
 
-main(WIN, WIDTH)
+# only open the window when run as a script, so the tour code can be imported headless
+
+if __name__ == "__main__":
+    WIN = pygame.display.set_mode((WIDTH, WIDTH))
+    pygame.display.set_caption("EULERIAN TOUR EXPLORER")
+    main(WIN, WIDTH)
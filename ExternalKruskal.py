@@ -0,0 +1,242 @@
+"""
+EXTERNAL-MEMORY FILTER-KRUSKAL
+
+Kruskal's algorithm for edge lists that do not fit in memory. Only the union-find over the nodes and one
+partition of edges are ever held in memory; everything else streams from, and spills to, disk.
+
+HOW IT WORKS (Filter-Kruskal):
+- A partition that fits in memory is loaded, filtered, sorted by weight and scanned like Kruskals.algorithm.
+- A larger one is split by weight around pivots sampled from it, streaming it in chunks and appending each
+  edge to the spill file of its weight range. The ranges are then solved lightest first.
+- Filter: before a range is sorted, every edge whose endpoints are already in the same component is dropped.
+  Heavy edges mostly end up inside components built from the light ones, so they are never sorted at all.
+
+Ties are resolved in file order, like Kruskal's stable sort, so the forest matches Kruskals.algorithm.
+
+EDGE FILES: packed little-endian records of (u: uint32, v: uint32, w: float64), 16 bytes per edge.
+
+USAGE:
+    python ExternalKruskal.py gen edges.bin --nodes 1000000 --edges 50000000
+    python ExternalKruskal.py mst edges.bin --nodes 1000000 --memory-edges 4000000 --out forest.bin
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+EDGE = np.dtype([("u", "<u4"), ("v", "<u4"), ("w", "<f8")])
+
+
+def write_edges(filename, u, v, w, append=False):
+    edges = np.empty(len(u), dtype=EDGE)
+    edges["u"], edges["v"], edges["w"] = u, v, w
+    with open(filename, "ab" if append else "wb") as f:
+        edges.tofile(f)
+
+
+def read_edges(filename, chunk):
+    """
+    Yield the edges of a file as structured arrays of at most chunk edges.
+    """
+    with open(filename, "rb") as f:
+        while True:
+            edges = np.fromfile(f, dtype=EDGE, count=chunk)
+            if len(edges) == 0:
+                return
+            yield edges
+
+
+def count_edges(filename):
+    return os.path.getsize(filename) // EDGE.itemsize
+
+
+class ExternalKruskal:
+    def __init__(self, n, memory_edges=1 << 22, tmpdir=None, seed=None):
+        """
+        n is the number of nodes (0 .. n-1). memory_edges bounds how many edges are loaded at once.
+        """
+        self.parent = array("q", range(n)) # union-find; an array so numpy can view it without copying
+        self.parent_view = np.frombuffer(self.parent, dtype=np.int64)
+        self.memory_edges = memory_edges
+        self.tmpdir = tmpdir
+        self.rng = np.random.default_rng(seed)
+        self.forest = [] # chunks of forest edges, as EDGE arrays
+        self.spilled = 0 # edges written to spill files, over the whole run
+        self.splits = 0
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]] # path halving
+            x = parent[x]
+        return x
+
+    def roots(self, nodes):
+        """
+        Vectorized find for an array of nodes. Compresses the paths of the nodes it was asked about.
+        """
+        parent = self.parent_view
+        r = parent[nodes]
+        while True:
+            up = parent[r]
+            if np.array_equal(up, r):
+                break
+            r = up
+        parent[nodes] = r
+        return r
+
+    def filter(self, edges): # drop the edges that already lie inside a component
+        return edges[self.roots(edges["u"].astype(np.int64)) != self.roots(edges["v"].astype(np.int64))]
+
+    def scan(self, edges):
+        """
+        Kruskal's scan of an in-memory partition: filter, stable sort by weight, union.
+        """
+        edges = self.filter(edges)
+        edges = edges[np.argsort(edges["w"], kind="stable")]
+        taken = []
+        parent = self.parent
+        for i, (u, v) in enumerate(zip(edges["u"].tolist(), edges["v"].tolist())):
+            ru, rv = self.find(u), self.find(v)
+            if ru != rv:
+                parent[rv] = ru
+                taken.append(i)
+        if taken:
+            self.forest.append(edges[taken])
+
+    def solve(self, filename):
+        """
+        Solve a partition stored in a file. The file is left as it is; spill files are cleaned up.
+        """
+        size = count_edges(filename)
+        if size <= self.memory_edges:
+            self.scan(np.fromfile(filename, dtype=EDGE))
+            return
+
+        low, high, sample = self.sample(filename, size)
+        if low == high: # a single weight: file order is already sorted order, scan it chunk by chunk
+            for edges in read_edges(filename, self.memory_edges):
+                self.scan(edges)
+            return
+
+        parts = max(2, -(-2 * size // self.memory_edges)) # aim at half-full partitions
+        pivots = np.unique(np.quantile(sample, np.arange(1, parts) / parts, method="lower"))
+        spill_dir = tempfile.mkdtemp(prefix="kruskal-", dir=self.tmpdir)
+        try:
+            names = self.split(filename, pivots, spill_dir)
+            if max((count_edges(name) for name in names if os.path.exists(name)), default=0) == size:
+                # the sample missed the spread of weights: halve the weight range, which always makes progress
+                for name in names:
+                    if os.path.exists(name):
+                        os.remove(name)
+                middle = low + (high - low) / 2
+                names = self.split(filename, np.array([middle if middle < high else low]), spill_dir)
+            for name in names: # lightest range first
+                if os.path.exists(name):
+                    self.solve(name)
+                    os.remove(name)
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def sample(self, filename, size, count=100000):
+        """
+        The lowest and highest weight of a file, and a uniform sample of its weights.
+        """
+        keep = min(1.0, count / size)
+        low, high, sample = np.inf, -np.inf, []
+        for edges in read_edges(filename, self.memory_edges):
+            w = edges["w"]
+            low, high = min(low, w.min()), max(high, w.max())
+            sample.append(w[self.rng.random(len(w)) < keep])
+        sample = np.concatenate(sample)
+        return low, high, sample if len(sample) else np.array([low])
+
+    def split(self, filename, pivots, spill_dir):
+        """
+        Stream a file into one spill file per weight range, filtering as we go. Returns the file names in
+        weight order; ranges that received no edges have no file.
+        """
+        self.splits += 1
+        names = [os.path.join(spill_dir, f"part-{self.splits}-{i}.bin") for i in range(len(pivots) + 1)]
+        files = [None] * len(names)
+        try:
+            for edges in read_edges(filename, self.memory_edges):
+                edges = self.filter(edges)
+                bucket = np.searchsorted(pivots, edges["w"], side="left") # ties with a pivot go below it
+                order = np.argsort(bucket, kind="stable") # group by range, keeping file order within each
+                edges, bucket = edges[order], bucket[order]
+                bounds = np.searchsorted(bucket, np.arange(len(names) + 1))
+                for i in range(len(names)):
+                    if bounds[i] < bounds[i + 1]:
+                        if files[i] is None:
+                            files[i] = open(names[i], "wb")
+                        edges[bounds[i]:bounds[i + 1]].tofile(files[i])
+                        self.spilled += int(bounds[i + 1] - bounds[i])
+        finally:
+            for f in files:
+                if f is not None:
+                    f.close()
+        return names
+
+    def result(self):
+        if not self.forest:
+            return np.empty(0, dtype=EDGE)
+        return np.concatenate(self.forest)
+
+
+def minimum_spanning_forest(filename, n, memory_edges=1 << 22, tmpdir=None, seed=None):
+    """
+    Minimum spanning forest of the edge file, as an EDGE array in the order Kruskal's algorithm adds them.
+    """
+    solver = ExternalKruskal(n, memory_edges, tmpdir, seed)
+    solver.solve(filename)
+    return solver.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="External-memory Filter-Kruskal over binary edge files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen_parser = sub.add_parser("gen", help="write a random edge file")
+    gen_parser.add_argument("filename")
+    gen_parser.add_argument("--nodes", type=int, default=1000000)
+    gen_parser.add_argument("--edges", type=int, default=10000000)
+    gen_parser.add_argument("--seed", type=int, default=0)
+
+    mst_parser = sub.add_parser("mst", help="compute the minimum spanning forest of an edge file")
+    mst_parser.add_argument("filename")
+    mst_parser.add_argument("--nodes", type=int, default=None, help="default: one more than the largest node id")
+    mst_parser.add_argument("--memory-edges", type=int, default=1 << 22)
+    mst_parser.add_argument("--tmpdir", default=None)
+    mst_parser.add_argument("--out", default=None, help="write the forest here, in the same format")
+    args = parser.parse_args()
+
+    if args.command == "gen":
+        rng = np.random.default_rng(args.seed)
+        step = 1 << 22
+        for lo in range(0, args.edges, step):
+            m = min(step, args.edges - lo)
+            write_edges(args.filename, rng.integers(0, args.nodes, m), rng.integers(0, args.nodes, m),
+                        rng.random(m), append=lo > 0)
+        return
+
+    n = args.nodes
+    if n is None:
+        n = 1 + max((int(max(e["u"].max(), e["v"].max())) for e in read_edges(args.filename, 1 << 22)), default=-1)
+    began = time.perf_counter()
+    solver = ExternalKruskal(n, args.memory_edges, args.tmpdir)
+    solver.solve(args.filename)
+    forest = solver.result()
+    print(f"{len(forest)} forest edges, weight {forest['w'].sum():.6f}, {time.perf_counter() - began:.1f}s, "
+          f"{solver.spilled} edges spilled")
+    if args.out:
+        forest.tofile(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+GRID MAPS
+
+A headless grid map: which cells are barriers, and nothing else. Services and preprocessing tools load a map
+once from a file and hand it to the search scripts without opening a window.
+
+FILE FORMAT:
+- One text line per row, '#' for a barrier and '.' for an open cell.
+- The grid is square like the GUI grids, so there are as many rows as there are columns.
+
+LAYOUTS:
+- GridMap stores the barrier flags row by row, so the cells above and below a cell are a whole row away in memory.
+- TiledGridMap stores them tile by tile (32 x 32 cells by default), in Z-order (Morton order) inside each tile, so
+  cells that are close on the map are close in memory in both directions. It keeps the same index/pos/neighbors
+  API; only the numbers it uses as cell indices differ, so code must go through that API rather than computing
+  row * rows + col itself. GridSearch.py benchmarks the two.
+
+POINT GRIDS: the helpers the Astar and Dijkstra GUIs share over their cells[row][col] grids of Points.
+- LazyCells makes those Points on demand from a GridMap.
+- Components labels the connected regions, so walled-off queries are rejected without a search.
+
+Run this file to write a random map, e.g. python GridMap.py map.txt --rows 200 --density 0.3
+"""
+
+import random
+
+import numpy as np
+
+
+class GridMap:
+    def __init__(self, rows, barriers=None): # barriers is a flat row-major sequence of 0/1 flags
+        self.rows = rows
+        self.barriers = bytearray(rows * rows) if barriers is None else bytearray(barriers)
+
+    def index(self, row, col):
+        return row * self.rows + col
+
+    def pos(self, index):
+        return divmod(index, self.rows)
+
+    def is_barrier(self, row, col):
+        return self.barriers[self.index(row, col)] == 1
+
+    def set_barrier(self, row, col, barrier=True):
+        self.barriers[self.index(row, col)] = 1 if barrier else 0
+
+    def neighbors(self, index):
+        """
+        Open neighbours of a cell, in the same order as Point.update_neighbors (DOWN, UP, RIGHT, LEFT).
+        """
+        rows = self.rows
+        row, col = divmod(index, rows)
+        barriers = self.barriers
+        neighbors = []
+        if row < rows - 1 and not barriers[index + rows]:
+            neighbors.append(index + rows)
+        if row > 0 and not barriers[index - rows]:
+            neighbors.append(index - rows)
+        if col < rows - 1 and not barriers[index + 1]:
+            neighbors.append(index + 1)
+        if col > 0 and not barriers[index - 1]:
+            neighbors.append(index - 1)
+        return neighbors
+
+    def components(self):
+        """
+        Connected component label of every cell (-1 for barriers), from one flood fill over the map.
+        """
+        labels = [-1] * len(self.barriers)
+        label = 0
+        for cell in range(len(self.barriers)):
+            if self.barriers[cell] or labels[cell] != -1:
+                continue
+            labels[cell] = label
+            stack = [cell]
+            while stack:
+                for neighbor in self.neighbors(stack.pop()):
+                    if labels[neighbor] == -1:
+                        labels[neighbor] = label
+                        stack.append(neighbor)
+            label += 1
+        return labels
+
+    def row(self, row):
+        """
+        The 0/1 barrier flags of one row, from column 0 onwards.
+        """
+        start = row * self.rows
+        return self.barriers[start:start + self.rows]
+
+    def apply(self, cells):
+        """
+        Mark the barriers of this map on a grid of Point objects (from make_cells) and return it.
+        """
+        for row in cells:
+            for point in row:
+                if self.barriers[self.index(point.row, point.col)]:
+                    point.make_barrier()
+        return cells
+
+    @classmethod
+    def from_cells(cls, cells):
+        grid = cls(len(cells))
+        for row in cells:
+            for point in row:
+                if point.is_barrier():
+                    grid.set_barrier(point.row, point.col)
+        return grid
+
+
+class TiledGridMap(GridMap):
+    def __init__(self, rows, barriers=None, tile=32):
+        """
+        Same arguments as GridMap, barriers still given row by row. tile is the side of a tile, a power of two.
+        """
+        if tile < 1 or tile & (tile - 1):
+            raise ValueError(f"tile must be a power of two, got {tile}")
+        self.rows = rows
+        self.tile = tile
+        self.tiles = -(-rows // tile) # tiles per row of tiles
+        area = tile * tile
+        spread = [0] * tile # the bits of x spread out to the even bit positions
+        for x in range(tile):
+            for bit in range(tile.bit_length()):
+                spread[x] |= (x >> bit & 1) << 2 * bit
+        # index(row, col) = row_part[row] + col_part[col]: the tile's offset plus the cell's Morton code in it
+        self.row_part = [(r // tile) * self.tiles * area + (spread[r % tile] << 1) for r in range(rows)]
+        self.col_part = [(c // tile) * area + spread[c % tile] for c in range(rows)]
+        self.odd_bits = spread[tile - 1] << 1 # the row bits of a Morton code
+        self.even_bits = spread[tile - 1] # the column bits
+        self.last_tile_row = (self.tiles - 1) * self.tiles * area # index of the first cell of the last row of tiles
+        self.within = [None] * area # Morton code -> (row, col) inside the tile
+        for r in range(tile):
+            for c in range(tile):
+                self.within[spread[r] << 1 | spread[c]] = (r, c)
+
+        self.barriers = bytearray(b"\x01") * (self.tiles * self.tiles * area) # cells past the map edge are barriers
+        flags = np.frombuffer(self.barriers, dtype=np.uint8)
+        source = None if barriers is None else np.frombuffer(bytes(barriers), dtype=np.uint8).reshape(rows, rows)
+        self.col_offsets = np.array(self.col_part, dtype=np.int64)
+        for r in range(rows): # scatter one row at a time
+            flags[self.row_part[r] + self.col_offsets] = 0 if source is None else source[r]
+
+    @classmethod
+    def from_grid(cls, grid, tile=32):
+        return cls(grid.rows, b"".join(bytes(grid.row(r)) for r in range(grid.rows)), tile)
+
+    def index(self, row, col):
+        return self.row_part[row] + self.col_part[col]
+
+    def pos(self, index):
+        tile, code = divmod(index, self.tile * self.tile)
+        tile_row, tile_col = divmod(tile, self.tiles)
+        row, col = self.within[code]
+        return tile_row * self.tile + row, tile_col * self.tile + col
+
+    def neighbors(self, index):
+        """
+        Steps inside a tile are done on the Morton code directly: adding 1 to the row (odd) bits or the column
+        (even) bits, with the other bits filled in so the carry runs through. Only a step off the tile needs the
+        tile's position. Cells past the map edge are barriers, so they never come back as neighbours.
+        """
+        area, odd, even = self.tile * self.tile, self.odd_bits, self.even_bits
+        code = index & (area - 1)
+        base = index - code
+        row_bits, col_bits = code & odd, code & even
+        down = up = right = left = None
+        if row_bits != odd:
+            down = base + (((row_bits | even) + 1) & odd | col_bits)
+        elif base < self.last_tile_row: # the first row of the tile below
+            down = base + self.tiles * area + col_bits
+        if row_bits:
+            up = base + ((row_bits - 1) & odd | col_bits)
+        elif base >= self.tiles * area: # the last row of the tile above
+            up = base - self.tiles * area + odd | col_bits
+        if col_bits != even:
+            right = base + (((col_bits | odd) + 1) & even | row_bits)
+        elif (base // area) % self.tiles < self.tiles - 1:
+            right = base + area + row_bits
+        if col_bits:
+            left = base + ((col_bits - 1) & even | row_bits)
+        elif (base // area) % self.tiles:
+            left = base - area + even | row_bits
+
+        barriers = self.barriers
+        return [cell for cell in (down, up, right, left) if cell is not None and not barriers[cell]]
+
+    def row(self, row):
+        flags = np.frombuffer(self.barriers, dtype=np.uint8)
+        return flags[self.row_part[row] + self.col_offsets].tobytes()
+
+
+class LazyCells:
+    def __init__(self, grid, make_point):
+        """
+        The cells[row][col] grid of Points that make_cells and apply build, for a GridMap, but each Point is only
+        made the first time it is looked at. make_point(row, col) returns a new open Point. A GUI on a large map
+        then only pays for the cells it has drawn, clicked or searched.
+        """
+        self.grid = grid
+        self.make_point = make_point
+        self.points = {} # cell index -> its Point, for the cells looked at so far
+        self.by_row = [LazyRow(self, r) for r in range(grid.rows)]
+
+    def __len__(self):
+        return self.grid.rows
+
+    def __getitem__(self, row):
+        if isinstance(row, int) and row < 0: # a list of lists would wrap around; no caller means that here
+            raise IndexError(row)
+        return self.by_row[row]
+
+    def __iter__(self): # going through every row makes every Point: only for small maps
+        return iter(self.by_row)
+
+    def point(self, row, col):
+        index = self.grid.index(row, col)
+        point = self.points.get(index)
+        if point is None:
+            # the GUI thread draws cells while the SolverThread links them, and both may make the same cell's
+            # Point. setdefault publishes one of them atomically, so every caller gets the same Point
+            candidate = self.make_point(row, col)
+            if self.grid.barriers[index]:
+                candidate.make_barrier()
+            point = self.points.setdefault(index, candidate)
+        return point
+
+
+class LazyRow:
+    def __init__(self, cells, row):
+        self.cells = cells
+        self.row = row
+
+    def __len__(self):
+        return self.cells.grid.rows
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return [self.cells.point(self.row, c) for c in range(*col.indices(self.cells.grid.rows))]
+        if not 0 <= col < self.cells.grid.rows:
+            raise IndexError(col)
+        return self.cells.point(self.row, col)
+
+    def __iter__(self):
+        return (self.cells.point(self.row, c) for c in range(self.cells.grid.rows))
+
+
+# CONNECTIVITY INDEX over a grid of Points (make_cells, or LazyCells), shared by the Astar and Dijkstra GUIs.
+# Every open cell carries the label of its connected component, so two cells are reachable from
+# one another iff their labels share a root. This lets us reject walled-off queries before searching
+
+class Components:
+    def __init__(self, cells):
+        self.cells = cells
+        self.rebuild()
+
+    def open_neighbors(self, point): # same moves as update_neighbors, but read straight from the grid
+        row, col, rows = point.row, point.col, len(self.cells)
+        neighbors = []
+        if row < rows - 1 and not self.cells[row + 1][col].is_barrier(): # DOWN
+            neighbors.append(self.cells[row + 1][col])
+        if row > 0 and not self.cells[row - 1][col].is_barrier(): # UP
+            neighbors.append(self.cells[row - 1][col])
+        if col < rows - 1 and not self.cells[row][col + 1].is_barrier(): # RIGHT
+            neighbors.append(self.cells[row][col + 1])
+        if col > 0 and not self.cells[row][col - 1].is_barrier(): # LEFT
+            neighbors.append(self.cells[row][col - 1])
+        return neighbors
+
+    def rebuild(self): # label every component with a flood fill, O(rows * rows)
+        rows = len(self.cells)
+        self.labels = [[-1] * rows for _ in range(rows)] # -1 marks a barrier (or a cell not labelled yet)
+        self.parent = [] # union-find over labels, so that merging two components never relabels cells
+        for row in self.cells:
+            for point in row:
+                if point.is_barrier() or self.labels[point.row][point.col] != -1:
+                    continue
+                label = len(self.parent)
+                self.parent.append(label)
+                self.labels[point.row][point.col] = label
+                stack = [point]
+                while stack:
+                    current = stack.pop()
+                    for neighbor in self.open_neighbors(current):
+                        if self.labels[neighbor.row][neighbor.col] == -1:
+                            self.labels[neighbor.row][neighbor.col] = label
+                            stack.append(neighbor)
+        self.stale = False
+
+    def find(self, label):
+        while self.parent[label] != label:
+            self.parent[label] = self.parent[self.parent[label]] # path halving
+            label = self.parent[label]
+        return label
+
+    def splits(self, point): # can turning this cell into a barrier split its component?
+        # walk the 8 cells around the point in a cycle. Consecutive cells of the ring touch each other,
+        # so the open 4-neighbours stay connected if they all lie on a single run of open ring cells
+        rows = len(self.cells)
+        ring = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+        is_open = []
+        for dr, dc in ring:
+            row, col = point.row + dr, point.col + dc
+            is_open.append(0 <= row < rows and 0 <= col < rows and not self.cells[row][col].is_barrier())
+
+        runs = 0 # number of open runs on the ring that hold at least one 4-neighbour
+        for i in range(8):
+            if is_open[i] and not is_open[i - 1]: # a run starts here
+                j, holds_neighbor = i, False
+                while is_open[j % 8]:
+                    holds_neighbor = holds_neighbor or j % 2 == 0 # 4-neighbours sit at the even positions
+                    j += 1
+                runs += holds_neighbor
+        return runs > 1
+
+    def add_barrier(self, point): # call after point.make_barrier()
+        if self.stale or self.labels[point.row][point.col] == -1:
+            return
+        self.labels[point.row][point.col] = -1
+        if self.splits(point): # removing a cell may cut its component in two, so relabel on the next query
+            self.stale = True
+
+    def remove_barrier(self, point): # call after point.reset()
+        if self.stale or self.labels[point.row][point.col] != -1 or point.is_barrier():
+            return
+        label = len(self.parent)
+        self.parent.append(label)
+        self.labels[point.row][point.col] = label
+        for neighbor in self.open_neighbors(point): # the reopened cell joins all components around it
+            root = self.find(self.labels[neighbor.row][neighbor.col])
+            if root != label:
+                self.parent[root] = label
+
+    def connected(self, p1, p2): # O(1) unless a barrier split forced a relabel
+        if self.stale:
+            self.rebuild()
+        l1 = self.labels[p1.row][p1.col]
+        l2 = self.labels[p2.row][p2.col]
+        if l1 == -1 or l2 == -1:
+            return False
+        return self.find(l1) == self.find(l2)
+
+
+def load_map(filename):
+    with open(filename) as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    rows = len(lines)
+    barriers = bytearray()
+    for line in lines:
+        if len(line) != rows:
+            raise ValueError(f"{filename}: every row must have {rows} cells, got {len(line)}")
+        barriers.extend(1 if c == "#" else 0 for c in line)
+    return GridMap(rows, barriers)
+
+
+def save_map(grid, filename):
+    with open(filename, "w") as f:
+        for row in range(grid.rows):
+            f.write("".join("#" if b else "." for b in grid.row(row)) + "\n")
+
+
+def random_map(rows, density=0.3, seed=None):
+    """
+    Scatter barriers uniformly at random over a rows x rows grid.
+    """
+    rng = random.Random(seed)
+    return GridMap(rows, (1 if rng.random() < density else 0 for _ in range(rows * rows)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a random grid map.")
+    parser.add_argument("filename")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    save_map(random_map(args.rows, args.density, args.seed), args.filename)
@@ -1,15 +1,16 @@
 """
 KRUSKAL'S MINIMUM SPANNING TREE ALGORITHM
 Instruction: Run file. Create your own graph by clicking the desired from cell and to cell to create graph edges.
-Note: The graph must be connected for the program to work. That is, there must be a path connecting any two selected cells.
+Press space to show the minimum spanning tree. Edges are added to it as you draw them, so nothing is recomputed.
+If the graph is not connected, the minimum spanning forest (one tree per connected piece) is shown.
 To clear grid and try again, press c.
 """
 
 import pygame
+import numpy as np
 
 WIDTH = 800 # the width of our square map
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("KRUSKAL'S MINIMUM SPANNING TREE")
+FPS = 60 # frame cap of the main loop
 
 RED = (255, 0, 0)
 WHITE = (255, 255, 255)
@@ -82,6 +83,20 @@ def get_clicked_pose(pos, rows, width):
 
     return row, col
 
+# draw line segments from starts[i] to ends[i] (n x 2 arrays of pixel positions) onto a transparent surface.
+# It is drawn once when the edges change, and the main loop blits it every frame instead of drawing each line
+
+def edge_overlay(width, starts, ends, color):
+    overlay = pygame.Surface((width, width), pygame.SRCALPHA)
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        pygame.draw.line(overlay, color, a, b, width=3)
+    return overlay
+
+# pixel centres of a list of points, as an n x 2 array
+
+def centers(points, increment):
+    return np.array([(p.x, p.y) for p in points], dtype=np.int64).reshape(-1, 2) + increment // 2
+
 # find the absolute root/parent of a node
 
 def find(parent, node, V): 
@@ -121,7 +136,7 @@ def algorithm(graph, V):
         parent.append(node)
         rank.append(0)
 
-    while e < max_edges:
+    while e < max_edges and i < len(graph): # out of edges early means the graph is disconnected: return the forest
         u, v, w = graph[i]
         x = find(parent, u, V)
         y = find(parent, v, V)
@@ -134,6 +149,138 @@ def algorithm(graph, V):
 
     return result    
 
+# AN ONLINE MINIMUM SPANNING FOREST
+# Edges arrive one at a time (or in batches) and the forest is kept up to date, instead of re-sorting every edge
+# seen so far. Uses the cycle property: a new edge inside a tree replaces the heaviest edge on the tree path
+# between its endpoints if it is lighter, and is dropped otherwise. Disconnected input simply gives a forest.
+
+class OnlineMST:
+    def __init__(self):
+        self.adj = {} # forest adjacency: node -> {neighbour: weight}
+        self.parent = {} # union-find over the trees of the forest. Trees only ever merge, so it never goes stale
+        self.rank = {}
+        self.total = 0 # weight of the forest
+
+    def find(self, node):
+        while self.parent[node] != node:
+            self.parent[node] = self.parent[self.parent[node]] # path halving
+            node = self.parent[node]
+        return node
+
+    def add_node(self, node):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.rank[node] = 0
+            self.adj[node] = {}
+
+    def link(self, u, v, w):
+        self.adj[u][v] = w
+        self.adj[v][u] = w
+        self.total += w
+
+    def cut(self, u, v):
+        self.total -= self.adj[u].pop(v)
+        del self.adj[v][u]
+
+    def tree_path(self, u, v): # the edges on the tree path from u to v, found by a DFS from u
+        came_from = {u: None}
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node == v:
+                break
+            for neighbor in self.adj[node]:
+                if neighbor not in came_from:
+                    came_from[neighbor] = node
+                    stack.append(neighbor)
+        path = []
+        while came_from[v] is not None:
+            path.append((came_from[v], v))
+            v = came_from[v]
+        return path
+
+    def add_edge(self, u, v, w):
+        """
+        Add one edge. Returns True if the forest changed.
+        """
+        if u == v:
+            return False
+        self.add_node(u)
+        self.add_node(v)
+
+        x, y = self.find(u), self.find(v)
+        if x != y: # joins two trees: always part of the forest
+            if self.rank[x] < self.rank[y]:
+                x, y = y, x
+            self.parent[y] = x
+            if self.rank[x] == self.rank[y]:
+                self.rank[x] += 1
+            self.link(u, v, w)
+            return True
+
+        # closes a cycle: the heaviest edge on it goes. Costs a walk over one tree, not a sort of all edges
+        a, b = max(self.tree_path(u, v), key=lambda edge: self.adj[edge[0]][edge[1]])
+        if w < self.adj[a][b]:
+            self.cut(a, b)
+            self.link(u, v, w)
+            return True
+        return False
+
+    def add_batch(self, edges):
+        """
+        Add many [u, v, w] edges at once. The new forest is the minimum spanning forest of the current forest
+        edges plus the batch, so only those are sorted. Cheaper than add_edge per edge for large batches.
+        """
+        candidates = self.edges()
+        for u, v, w in edges:
+            if u != v:
+                candidates.append([u, v, w])
+                self.add_node(u)
+                self.add_node(v)
+
+        for node in self.parent: # start over from single-node trees
+            self.parent[node] = node
+            self.rank[node] = 0
+            self.adj[node] = {}
+        self.total = 0
+        for u, v, w in sorted(candidates, key=lambda item: item[2]):
+            x, y = self.find(u), self.find(v)
+            if x != y:
+                if self.rank[x] < self.rank[y]:
+                    x, y = y, x
+                self.parent[y] = x
+                if self.rank[x] == self.rank[y]:
+                    self.rank[x] += 1
+                self.link(u, v, w)
+
+    def add_stream(self, filename, batch_size=100000):
+        """
+        Feed edges from a text file with one "u v w" edge per line (integer nodes), batch_size edges at a time,
+        so the whole edge list never has to be in memory.
+        """
+        batch = []
+        with open(filename) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 3 or fields[0].startswith("#"):
+                    continue
+                batch.append([int(fields[0]), int(fields[1]), float(fields[2])])
+                if len(batch) == batch_size:
+                    self.add_batch(batch)
+                    batch = []
+        if batch:
+            self.add_batch(batch)
+
+    def edges(self): # the forest as a list of [u, v, w], like algorithm returns
+        result = []
+        done = set()
+        for u in self.adj:
+            for v, w in self.adj[u].items():
+                if v not in done: # each edge is listed from whichever end we reach first
+                    result.append([u, v, w])
+            done.add(u)
+        return result
+
 # main function that combines the Kruskal's algorithm and the GUI
 
 def main(win, width):
@@ -147,13 +294,37 @@ def main(win, width):
     coord = []
     vertices = []
     result = []
+    mst = OnlineMST()
 
+    clock = pygame.time.Clock()
+    overlay = None # the drawn edges, rebuilt only when they change
+    dirty = True # only redraw when something changed
     while run:
-        draw(win, cells, ROWS, width)
-        for event in pygame.event.get():
+        if dirty:
+            draw(win, cells, ROWS, width)
+            if overlay is None: # the edges are drawn once into an overlay, so showing them is a single blit
+                if not begin:
+                    ends = centers(vertices[:len(vertices) // 2 * 2], increment) # every two clicks make an edge
+                    overlay = edge_overlay(width, ends[0::2], ends[1::2], RED)
+                else:
+                    overlay = edge_overlay(width, centers([e[0] for e in result], increment),
+                                           centers([e[1] for e in result], increment), BLACK)
+            win.blit(overlay, (0, 0))
+
+            pygame.display.flip()
+            dirty = False
+        clock.tick(FPS)
+
+        for event in [pygame.event.wait()] + pygame.event.get(): # sleep until something happens
             if event.type == pygame.QUIT:
                 run = False
 
+            if event.type != pygame.MOUSEMOTION or any(event.buttons): # plain mouse moves change nothing
+                dirty = True
+
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN): # may add edges or change what is shown
+                overlay = None
+
             if event.type == pygame.MOUSEBUTTONDOWN: #pygame.mouse.get_pressed()[0]: # Left mouse button
                 mouse_presses = pygame.mouse.get_pressed()
                 if mouse_presses[0]:
@@ -164,57 +335,35 @@ def main(win, width):
                     coord.append(pos)
                     point.make_closed()
 
+                    if len(vertices) % 2 == 0: # this click closes an edge: add it to the forest right away
+                        p_1 = vertices[-2]
+                        p_2 = vertices[-1]
+                        x_1 = p_1.x + (increment // 2)
+                        y_1 = p_1.y + (increment // 2)
+                        x_2 = p_2.x + (increment // 2)
+                        y_2 = p_2.y + (increment // 2)
+                        d = ((y_2 - y_1)**2 + (x_2 - x_1)**2)**0.5 # Euclidian Distance
+                        if mst.add_edge(p_1, p_2, d) and begin:
+                            result = mst.edges()
+
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    edge_length = []
-                    graph = []
-                    for i in range(len(coord) - 1):
-                        if (i % 2) == 0:
-                            p_1 = vertices[i]
-                            p_2 = vertices[i + 1]
-                            x_1 = p_1.x + (increment // 2)
-                            y_1 = p_1.y + (increment // 2)
-                            x_2 = p_2.x + (increment // 2)
-                            y_2 = p_2.y + (increment // 2)
-                            d = ((y_2 - y_1)**2 + (x_2 - x_1)**2)**0.5 # Euclidian Distance
-                            edge_length.append(d)
-                        
-                    for j in range(len(edge_length)):
-                        i = 2 * j
-                        graph.append([vertices[i], vertices[i + 1], edge_length[j]])
-
-                    V = list(set(vertices))
                     begin = True
-                    result = algorithm(graph, V)
+                    result = mst.edges() # already up to date, nothing to recompute
 
                 if event.key == pygame.K_c: # Press c to clear screen
                     cells = make_cells(ROWS, width)
                     vertices.clear()
                     coord.clear()
                     result.clear()
+                    mst = OnlineMST()
                     begin = False
-        
-        if not begin and len(vertices) >= 2:
-            for i in range(1, len(coord)):
-                if (i % 2) != 0:
-                    d = increment // 2
-                    pygame.draw.line(win, RED,
-                                    (vertices[i].x + d, vertices[i].y + d),
-                                    (vertices[i - 1].x + d, vertices[i - 1].y + d),
-                                    width=3)
-
-        else:
-            for i in range(len(result)):
-                initial = result[i][0]
-                final = result[i][1]
-                initial_x = initial.x + (increment // 2)
-                initial_y = initial.y + (increment // 2)
-                final_x = final.x + (increment // 2)
-                final_y = final.y + (increment // 2)
-                pygame.draw.line(win, BLACK, (initial_x, initial_y), (final_x, final_y), width = 3)   
-
-        pygame.display.flip()
             
     pygame.quit()
 
-main(WIN, WIDTH)
+# only open the window when run as a script, so the spanning tree code can be imported headless
+
+if __name__ == "__main__":
+    WIN = pygame.display.set_mode((WIDTH, WIDTH))
+    pygame.display.set_caption("KRUSKAL'S MINIMUM SPANNING TREE")
+    main(WIN, WIDTH)
@@ -0,0 +1,292 @@
+"""
+MULTI-AGENT PATH PLANNING
+
+Plans paths for a fleet of agents sharing one grid map, so that no two agents are in the same cell at the
+same time and no two agents swap cells along the same edge.
+
+The single-agent search is A* over (cell, time) states. Each step an agent moves DOWN/UP/RIGHT/LEFT like in
+Astar.py, or waits where it is. It is guided by the true distance to the goal around the barriers (ignoring the
+other agents), not the manhattan distance: with manhattan, an agent that has to go around a wall first searches
+every state in front of it, at every time step. The true distances come from an A* search outward from the
+goal, run until it reaches the agent's start (as in Reverse Resumable A*). That covers the cells along the
+shortest paths; for the cells it has not reached, it still gives a lower bound.
+
+MODES:
+- Prioritized planning (plan_prioritized): agents are planned one after the other. Each finished path is
+  written into a space-time reservation table that later agents must avoid. Fast, but not complete.
+- Conflict-based search (plan_cbs): plan everyone independently, find the first conflict, and branch on which
+  of the two agents has to give way. Finds the minimum sum of costs; use it for small, crowded groups.
+
+The reservation table keys (cell, time) as a single integer, time * cells + cell, kept in a Python set, so its
+size follows the number of reserved steps instead of map size times horizon.
+"""
+
+import heapq
+import time
+from itertools import count
+
+
+def h(p1, p2): # manhattan distance between two (row, col) cells. Local, so planning never imports pygame
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+
+class ReservationTable:
+    def __init__(self, grid):
+        self.cells = len(grid.barriers) # the key stride: every cell index is below it, padding included
+        self.vertices = set() # time * cells + cell: someone is in that cell at that time
+        self.edges = set() # (time * cells + from_cell) * cells + to_cell: someone moves along it at that time
+        self.parked = {} # cell -> time from which an agent sits there for good (it reached its goal)
+        self.last_visit = {} # cell -> last time any agent passes through, so nobody parks in someone's way
+
+    def reserve(self, path):
+        """
+        Reserve a path given as a list of cell indices, one per time step. The agent stays at its last cell.
+        """
+        cells = self.cells
+        for t, cell in enumerate(path):
+            self.vertices.add(t * cells + cell)
+            if t > 0 and path[t - 1] != cell:
+                self.edges.add(((t - 1) * cells + path[t - 1]) * cells + cell)
+            self.last_visit[cell] = max(self.last_visit.get(cell, -1), t)
+        goal = path[-1]
+        self.parked[goal] = min(self.parked.get(goal, len(path) - 1), len(path) - 1)
+
+    def blocked(self, cell, t, prev):
+        """
+        Can an agent not be in cell at time t, coming from prev at time t - 1?
+        """
+        cells = self.cells
+        if t * cells + cell in self.vertices:
+            return True
+        if self.parked.get(cell, t + 1) <= t:
+            return True
+        return prev != cell and ((t - 1) * cells + cell) * cells + prev in self.edges # swapping places
+
+
+class GoalDistance:
+    def __init__(self, grid, goal, toward):
+        """
+        Lower bounds on the number of steps from a cell to goal, exact for every cell an A* search from goal,
+        aimed at toward (the agent's start), has closed so far.
+        """
+        self.grid = grid
+        self.goal = grid.pos(goal)
+        self.toward = grid.pos(toward)
+        self.closed = {} # cell -> its exact distance to goal
+        self.g_score = {goal: 0}
+        self.open_set = [(h(self.goal, self.toward), 0, goal)] # (f, -g, cell): equal f, deeper first
+
+    def __call__(self, cell):
+        distance = self.closed.get(cell)
+        if distance is not None:
+            return distance
+        if not self.open_set:
+            return float("inf") # everything reachable from goal is closed
+        # every cell with g + manhattan to toward below the lowest f still open is closed, so this one is not
+        # nearer than that. Cheaper than resuming the search, which would first close every cell on every
+        # equally short path: on a grid, most of the rectangle between goal and toward
+        pos = self.grid.pos(cell)
+        return max(h(pos, self.goal), self.open_set[0][0] - h(pos, self.toward))
+
+    def exact(self, cell):
+        """
+        The true distance from cell to goal (inf if it is walled off), resuming the search until cell is closed.
+        """
+        closed, g_score, open_set = self.closed, self.g_score, self.open_set
+        neighbors, pos, (to_row, to_col) = self.grid.neighbors, self.grid.pos, self.toward
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while cell not in closed and open_set:
+            _, g, current = heappop(open_set)
+            if current in closed:
+                continue
+            closed[current] = -g # manhattan is consistent, so g is exact once a cell is popped
+            g -= 1 # the neighbours' -g
+            for neighbor in neighbors(current):
+                if neighbor not in g_score or -g < g_score[neighbor]:
+                    g_score[neighbor] = -g
+                    row, col = pos(neighbor)
+                    heappush(open_set, (abs(row - to_row) + abs(col - to_col) - g, g, neighbor))
+        return closed.get(cell, float("inf"))
+
+
+def space_time_astar(grid, start, goal, blocked, earliest_goal=0, max_time=None, distance=None):
+    """
+    A* over (cell, time) from start to goal, avoiding whatever blocked(cell, t, prev) rejects.
+    The agent may only finish at goal at or after earliest_goal, so that it does not park on a cell another
+    agent still has to cross. distance is a GoalDistance for goal, passed in to reuse it across searches.
+    By default the search gives up after max(shortest, earliest_goal) + shortest + rows time steps, where
+    shortest is the length of the shortest path ignoring other agents. Returns a list of cell indices, one per
+    time step, or None.
+    """
+    if distance is None:
+        distance = GoalDistance(grid, goal, start)
+    shortest = distance.exact(start)
+    if shortest == float("inf"):
+        return None
+    if max_time is None:
+        max_time = max(shortest, earliest_goal) + shortest + grid.rows # room to wait and detour, not forever
+    tie = count()
+    # equal f: prefer cells with an exact distance, then the state closer to goal, then the deeper one. Without
+    # this the agent fans out over every cell the bounds can't tell apart from the shortest path, and while it
+    # has to wait for earliest_goal, over every state that can still make it in time
+    open_set = [(max(shortest, earliest_goal), False, shortest, 0, next(tie), start, 0)]
+    came_from = {(start, 0): None}
+    while open_set:
+        *_, cell, t = heapq.heappop(open_set)
+        if cell == goal and t >= earliest_goal:
+            path = []
+            state = (cell, t)
+            while state is not None:
+                path.append(state[0])
+                state = came_from[state]
+            return path[::-1]
+        if t >= max_time:
+            continue
+
+        for neighbor in grid.neighbors(cell) + [cell]: # move, or wait in place
+            state = (neighbor, t + 1)
+            if state in came_from or blocked(neighbor, t + 1, cell):
+                continue
+            came_from[state] = (cell, t)
+            rest = distance(neighbor)
+            # arriving before earliest_goal doesn't count, so time left until then is a lower bound too
+            f = t + 1 + max(rest, earliest_goal - t - 1)
+            guess = neighbor not in distance.closed
+            heapq.heappush(open_set, (f, guess, rest, -(t + 1), next(tie), neighbor, t + 1))
+    return None
+
+
+def plan_prioritized(grid, agents, max_time=None):
+    """
+    agents is a list of (start, goal) pairs of (row, col) cells, in priority order.
+    Returns one path per agent as a list of (row, col) cells per time step, or None for an agent that could not
+    be planned around the agents before it.
+    """
+    table = ReservationTable(grid)
+    labels = grid.components() # walled-off goals are skipped instead of searched until max_time
+    paths = []
+    for start, goal in agents:
+        s, g = grid.index(*start), grid.index(*goal)
+        if labels[s] == -1 or labels[s] != labels[g]:
+            paths.append(None)
+            continue
+        path = space_time_astar(grid, s, g, table.blocked, table.last_visit.get(g, -1) + 1, max_time)
+        if path is None:
+            paths.append(None)
+            continue
+        table.reserve(path)
+        paths.append([grid.pos(cell) for cell in path])
+    return paths
+
+
+def first_conflict(paths):
+    """
+    The earliest conflict between two paths of cell indices, as (i, j, t, cell, prev). Either both agents are in
+    cell at time t (prev is None), or i moved prev -> cell while j moved cell -> prev. Agents wait at their goal
+    after arriving.
+    """
+    horizon = max(len(path) for path in paths)
+    at = lambda path, t: path[min(t, len(path) - 1)]
+    for t in range(horizon):
+        seen = {}
+        for i, path in enumerate(paths):
+            cell = at(path, t)
+            if cell in seen:
+                return seen[cell], i, t, cell, None
+            seen[cell] = i
+        if t == 0:
+            continue
+        moves = {}
+        for i, path in enumerate(paths):
+            prev, cell = at(path, t - 1), at(path, t)
+            if prev != cell:
+                if (cell, prev) in moves: # the other agent moved the opposite way
+                    return moves[(cell, prev)], i, t, prev, cell
+                moves[(prev, cell)] = i
+    return None
+
+
+def plan_cbs(grid, agents, max_nodes=10000, time_limit=None, max_time=None):
+    """
+    Conflict-based search. Same input and output as plan_prioritized, but the paths are conflict free with the
+    lowest sum of costs. Gives up (returns None) after max_nodes constraint-tree nodes or time_limit seconds.
+    """
+    starts = [grid.index(*start) for start, _ in agents]
+    goals = [grid.index(*goal) for _, goal in agents]
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    labels = grid.components()
+    if any(labels[s] == -1 or labels[s] != labels[g] for s, g in zip(starts, goals)):
+        return None
+
+    distances = [GoalDistance(grid, goal, start) for start, goal in zip(starts, goals)] # shared by replans
+
+    def plan(i, constraints):
+        vertex = {(cell, t) for cell, t, prev in constraints if prev is None}
+        edges = {(prev, cell, t) for cell, t, prev in constraints if prev is not None}
+        latest = max((t for cell, t, prev in constraints if cell == goals[i] and prev is None), default=-1)
+        blocked = lambda cell, t, prev: (cell, t) in vertex or (prev, cell, t) in edges
+        return space_time_astar(grid, starts[i], goals[i], blocked, latest + 1, max_time, distances[i])
+
+    def cost(paths):
+        return sum(len(path) - 1 for path in paths)
+
+    constraints = [frozenset() for _ in agents] # per agent: (cell, t, prev) it may not use
+    paths = [plan(i, constraints[i]) for i in range(len(agents))]
+    if any(path is None for path in paths):
+        return None
+
+    tie = count()
+    open_set = [(cost(paths), next(tie), constraints, paths)]
+    expanded = 0
+    while open_set and expanded < max_nodes:
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        _, _, constraints, paths = heapq.heappop(open_set)
+        expanded += 1
+        conflict = first_conflict(paths)
+        if conflict is None:
+            return [[grid.pos(cell) for cell in path] for path in paths]
+
+        i, j, t, cell, prev = conflict
+        # either agent i or agent j gives way. For a swap, i moved prev -> cell and j moved cell -> prev
+        branches = [(i, (cell, t, None))] if prev is None else [(i, (cell, t, prev))]
+        branches.append((j, (cell, t, None)) if prev is None else (j, (prev, t, cell)))
+        for agent, constraint in branches:
+            child = list(constraints)
+            child[agent] = constraints[agent] | {constraint}
+            path = plan(agent, child[agent])
+            if path is None:
+                continue
+            child_paths = list(paths)
+            child_paths[agent] = path
+            heapq.heappush(open_set, (cost(child_paths), next(tie), child, child_paths))
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    from GridMap import load_map
+
+    parser = argparse.ArgumentParser(description="Plan random agents on a grid map and time it.")
+    parser.add_argument("map_file")
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--mode", choices=("prioritized", "cbs"), default="prioritized")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    grid = load_map(args.map_file)
+    rng = random.Random(args.seed)
+    free = [grid.pos(v) for v in range(len(grid.barriers)) if not grid.barriers[v]]
+    cells = rng.sample(free, 2 * args.agents)
+    agents = list(zip(cells[:args.agents], cells[args.agents:]))
+
+    began = time.perf_counter()
+    if args.mode == "prioritized":
+        paths = plan_prioritized(grid, agents)
+    else:
+        paths = plan_cbs(grid, agents, time_limit=60)
+    elapsed = time.perf_counter() - began
+    planned = sum(path is not None for path in paths or ())
+    print(f"{planned}/{args.agents} agents planned in {elapsed:.2f}s ({planned / elapsed:.0f} agents/s)")
@@ -0,0 +1,148 @@
+"""
+LRU PATH CACHE
+
+Sits in front of the headless shortest_path query of Astar.py or Dijkstra.py and remembers the most recently
+used (start, end) answers, so repeated queries against a slowly changing map skip the search entirely.
+
+HOW IT STAYS CORRECT:
+- Drawing a barrier can only make paths longer, so only the cached paths that cross that cell are dropped.
+- Erasing a barrier can only make paths shorter, and only through that cell. A path from s to e of length L can
+  only get shorter through the erased cell c if |s - c| + |c - e| < L (manhattan distances), so only the paths
+  that fail this test are dropped, along with every cached "no path". A path as long as the manhattan distance
+  between its endpoints is already optimal and is never checked.
+- Callers that cannot tell which cells changed pass their own map version to query(). A version the cache has
+  not seen flushes everything.
+"""
+
+from collections import OrderedDict, defaultdict
+
+from PathCodec import decode_cells, path_length
+
+
+def cells(path): # the (row, col) cells of a cached path, whether it is a list or encoded bytes
+    if isinstance(path, bytes):
+        return decode_cells(path)
+    return path or ()
+
+
+def steps(path):
+    return path_length(path) if isinstance(path, bytes) else len(path) - 1
+
+
+class PathCache:
+    def __init__(self, solve, capacity=1024):
+        """
+        solve(start, end) takes two (row, col) cells and returns the list of (row, col) cells from start to end,
+        or None if there is no path. The path may also be encoded with PathCodec.encode_path. capacity is the
+        number of paths kept before the least recently used goes.
+        """
+        self.solve = solve
+        self.capacity = capacity
+        self.version = 0 # bumped on every map change the cache hears about
+        self.entries = OrderedDict() # (start, end) -> path, least recently used first
+        self.crossing = defaultdict(set) # cell -> keys of the cached paths through that cell
+        self.loose = {} # key -> path length, for the answers that could get shorter once a barrier is erased
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def query(self, start, end, version=None):
+        """
+        Return the path from start to end, from the cache if possible.
+        """
+        hit, path = self.lookup(start, end, version)
+        if not hit:
+            path = self.solve(start, end)
+            self.insert(start, end, path)
+        return path
+
+    def lookup(self, start, end, version=None):
+        """
+        Return (True, path) on a hit and (False, None) on a miss, without solving.
+        Useful when the solve happens elsewhere, e.g. in a worker pool; insert() the answer afterwards.
+        """
+        if version is not None and version != self.version:
+            self.clear()
+            self.version = version
+
+        key = (start, end)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+
+        self.misses += 1
+        return False, None
+
+    def insert(self, start, end, path):
+        key = (start, end)
+        if key in self.entries: # answered twice, e.g. by two overlapping solves
+            self.drop(key)
+        self.store(key, path)
+
+    def store(self, key, path):
+        self.entries[key] = path
+        (r1, c1), (r2, c2) = key
+        length = float("inf") if path is None else steps(path)
+        if length > abs(r1 - r2) + abs(c1 - c2): # longer than the manhattan lower bound
+            self.loose[key] = length
+        for cell in cells(path):
+            self.crossing[cell].add(key)
+
+        if len(self.entries) > self.capacity:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def drop(self, key):
+        path = self.entries.pop(key)
+        self.loose.pop(key, None)
+        for cell in cells(path):
+            keys = self.crossing[cell]
+            keys.discard(key)
+            if not keys:
+                del self.crossing[cell]
+
+    def barrier_added(self, cell):
+        """
+        A (row, col) cell became a barrier. Only the paths through it are affected.
+        """
+        self.version += 1
+        for key in list(self.crossing.get(cell, ())):
+            self.drop(key)
+            self.invalidations += 1
+
+    def barrier_removed(self, cell):
+        """
+        A (row, col) barrier was erased. Only a path that a detour through it would beat may now have a shortcut.
+        """
+        self.version += 1
+        row, col = cell
+        for key, length in list(self.loose.items()):
+            (r1, c1), (r2, c2) = key
+            if abs(r1 - row) + abs(c1 - col) + abs(row - r2) + abs(col - c2) < length:
+                self.drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.crossing.clear()
+        self.loose.clear()
+        self.version += 1
+
+    def stats(self):
+        """
+        Hit/miss/eviction counters, e.g. for logging or a service status endpoint.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,92 @@
+"""
+COMPACT PATH ENCODING
+
+A shortest path on a grid is mostly long straight runs, so instead of one (row, col) tuple per cell it can be
+stored as its start cell and the runs: which way, and for how many cells. A 20000 step path that takes over a
+megabyte as a list of tuples usually fits in a few kilobytes, which is cheap to cache, pickle between processes
+and send over a socket.
+
+FORMAT (bytes):
+- 8 byte header: start row and start column, little-endian uint32.
+- One byte per run: the top 2 bits are the direction, DOWN/UP/RIGHT/LEFT in the order of Point.update_neighbors,
+  the low 6 bits are the run length minus one. Runs longer than 64 cells take several bytes.
+A path of a single cell is just the header.
+
+Decoding never copies the buffer: NumPy reads the run bytes in place and expands them into a coordinate array.
+
+USAGE:
+    data = encode_path(path) # path is a list of (row, col) cells, as returned by shortest_path
+    coords = decode_path(data) # (n, 2) NumPy array of rows and columns
+"""
+
+import struct
+
+import numpy as np
+
+HEADER = struct.Struct("<II")
+MAX_RUN = 64
+STEPS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int64) # DOWN, UP, RIGHT, LEFT
+MOVES = {(int(dr), int(dc)): code for code, (dr, dc) in enumerate(STEPS)}
+
+
+def encode_path(path):
+    """
+    Encode a list of (row, col) cells, each one step away from the one before. None (no path) stays None.
+    """
+    if path is None:
+        return None
+    row, col = path[0]
+    data = bytearray(HEADER.pack(row, col))
+    direction, run = None, 0
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        move = MOVES.get((r2 - r1, c2 - c1))
+        if move is None:
+            raise ValueError(f"({r1}, {c1}) -> ({r2}, {c2}) is not a single DOWN/UP/RIGHT/LEFT step")
+        if move == direction and run < MAX_RUN:
+            run += 1
+            continue
+        if run:
+            data.append(direction << 6 | run - 1)
+        direction, run = move, 1
+    if run:
+        data.append(direction << 6 | run - 1)
+    return bytes(data)
+
+
+def runs(data):
+    """
+    The run bytes of an encoded path, as a read-only uint8 view into data.
+    """
+    return np.frombuffer(data, dtype=np.uint8, offset=HEADER.size)
+
+
+def decode_path(data):
+    """
+    The cells of an encoded path as an (n, 2) int64 array of (row, col), or None for None.
+    """
+    if data is None:
+        return None
+    codes = runs(data)
+    steps = np.repeat(STEPS[codes >> 6], (codes & 63).astype(np.intp) + 1, axis=0)
+    coords = np.empty((len(steps) + 1, 2), dtype=np.int64)
+    coords[0] = HEADER.unpack_from(data)
+    np.cumsum(steps, axis=0, out=coords[1:])
+    coords[1:] += coords[0]
+    return coords
+
+
+def decode_cells(data):
+    """
+    The cells of an encoded path as a list of (row, col) tuples, the form shortest_path returns.
+    """
+    if data is None:
+        return None
+    return [tuple(cell) for cell in decode_path(data).tolist()]
+
+
+def path_length(data):
+    """
+    Number of steps of an encoded path, without decoding it.
+    """
+    codes = runs(data)
+    return len(codes) + int((codes & 63).sum(dtype=np.int64))
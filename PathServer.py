@@ -0,0 +1,304 @@
+"""
+PATH QUERY SERVER
+
+Loads a grid map once and answers A* / Dijkstra shortest path queries over a local socket.
+
+PROTOCOL: newline-delimited JSON, one object per line in each direction. Replies carry the request's "id",
+and may come back out of order when a connection pipelines several queries.
+- {"id": 1, "algorithm": "astar", "start": [row, col], "end": [row, col]}
+  -> {"id": 1, "path": [[row, col], ...]} (path is null when end cannot be reached)
+  Add "encoding": "rle" to get the path as base64 of its PathCodec encoding instead, which is far shorter.
+- {"id": 2, "op": "info"} -> {"id": 2, "rows": ..., "workers": ...}
+- {"id": 3, "op": "stats"} -> {"id": 3, "cache": {...}, "coalesced": ..., "inflight": ...}
+Anything else gets {"id": ..., "error": "..."}.
+
+HOW IT SCALES:
+- Searches run in a pool of worker processes, each holding its own copy of the map.
+- Identical queries that are already being solved share the pending answer instead of searching again.
+- Answers go through an LRU PathCache before the pool is asked at all.
+- Workers hand paths back run-length encoded (PathCodec.py), and the cache keeps them that way, so long paths
+  are cheap to pickle between processes and to hold.
+- Backpressure: the pool only takes a bounded number of searches at a time, and each connection only has a
+  bounded number of queries outstanding. Past that we stop reading from the socket, so clients slow down
+  instead of the server queueing without limit.
+
+USAGE:
+    python PathServer.py serve map.txt --port 8765 --workers 4
+    python PathServer.py bench --port 8765 --requests 20000 --concurrency 32
+Use --unix PATH instead of --port on both sides for a Unix domain socket.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from GridMap import Components, load_map
+from PathCache import PathCache
+from PathCodec import decode_path
+
+ALGORITHMS = ("astar", "dijkstra")
+
+
+# worker processes. Each one builds the cells once, then serves queries against them
+
+_cells = None
+_components = None
+
+def init_worker(map_file):
+    global _cells, _components
+    import Astar # imported here so the parent process never pays for the GUI module
+
+    grid = load_map(map_file)
+    # Astar and Dijkstra share the same Point layout, so one grid of cells serves both searches
+    _cells = grid.apply(Astar.make_cells(grid.rows, grid.rows))
+    for row in _cells:
+        for point in row:
+            point.update_neighbors(_cells)
+    _components = Components(_cells)
+
+
+def solve(algorithm, start, end):
+    if algorithm == "astar":
+        from Astar import shortest_path
+    else:
+        from Dijkstra import shortest_path
+    return shortest_path(_cells, _cells[start[0]][start[1]], _cells[end[0]][end[1]], _components, compact=True)
+
+
+class PathServer:
+    def __init__(self, map_file, workers=None, cache_size=4096, max_pending=None, per_connection=64):
+        self.map_file = map_file
+        self.rows = load_map(map_file).rows
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(map_file,))
+        self.caches = {name: PathCache(None, cache_size) for name in ALGORITHMS} # solves go through the pool
+        self.inflight = {} # (algorithm, start, end) -> future shared by every identical pending query
+        self.pending = asyncio.Semaphore(max_pending or 4 * self.workers)
+        self.per_connection = per_connection
+        self.coalesced = 0
+
+    async def query(self, algorithm, start, end):
+        cache = self.caches[algorithm]
+        hit, path = cache.lookup(start, end)
+        if hit:
+            return path
+
+        key = (algorithm, start, end)
+        future = self.inflight.get(key)
+        if future is not None: # somebody is already solving this one, wait for their answer
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            async with self.pending:
+                path = await asyncio.get_running_loop().run_in_executor(self.pool, solve, algorithm, start, end)
+            cache.insert(start, end, path)
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # mark as retrieved, in case nobody else was waiting on it
+            raise
+        finally:
+            del self.inflight[key]
+        return path
+
+    def parse_cell(self, request, field):
+        if field not in request:
+            raise ValueError(f"missing field {field!r}, expected [row, col]")
+        value = request[field]
+        if not (isinstance(value, list) and len(value) == 2 and all(type(v) is int for v in value)): # not bool
+            raise ValueError(f"{field} must be [row, col] with integer row and col, got {json.dumps(value)}")
+        row, col = value
+        if not (0 <= row < self.rows and 0 <= col < self.rows):
+            raise ValueError(f"{field} {value} is outside the {self.rows}x{self.rows} map")
+        return row, col
+
+    async def answer(self, request):
+        reply = {"id": request.get("id")}
+        op = request.get("op", "path")
+        if op == "info":
+            reply.update(rows=self.rows, workers=self.workers)
+        elif op == "stats":
+            reply.update(cache={name: cache.stats() for name, cache in self.caches.items()},
+                         coalesced=self.coalesced, inflight=len(self.inflight))
+        elif op == "path":
+            algorithm = request.get("algorithm", "astar")
+            if algorithm not in ALGORITHMS:
+                raise ValueError(f"unknown algorithm {algorithm!r}, expected one of {ALGORITHMS}")
+            encoding = request.get("encoding", "cells")
+            if encoding not in ("cells", "rle"):
+                raise ValueError(f"unknown encoding {encoding!r}, expected 'cells' or 'rle'")
+            path = await self.query(algorithm, self.parse_cell(request, "start"), self.parse_cell(request, "end"))
+            if path is None:
+                reply["path"] = None
+            elif encoding == "rle":
+                reply["path"] = base64.b64encode(path).decode()
+            else:
+                reply["path"] = decode_path(path).tolist()
+        else:
+            raise ValueError(f"unknown op {op!r}")
+        return reply
+
+    async def handle(self, reader, writer):
+        outstanding = asyncio.Semaphore(self.per_connection)
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                try:
+                    request = json.loads(line)
+                except ValueError as e: # not JSON, or not UTF-8
+                    request, reply = None, {"id": None, "error": f"bad json: {e}"}
+                else:
+                    reply = {"id": None, "error": f"a request must be a JSON object, got {type(request).__name__}"}
+                if isinstance(request, dict):
+                    try:
+                        reply = await self.answer(request)
+                    except Exception as e: # bad fields, or a failed search: report it and keep the connection
+                        reply = {"id": request.get("id"), "error": str(e)}
+                async with write_lock:
+                    writer.write((json.dumps(reply) + "\n").encode())
+                    await writer.drain()
+            except ConnectionError: # the client is gone; the read loop notices and closes
+                pass
+            finally:
+                outstanding.release() # always, or the connection stops reading once per_connection are lost
+
+        try:
+            while True:
+                await outstanding.acquire() # full? stop reading until a reply goes out
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix=None):
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving {self.map_file} ({self.rows}x{self.rows}) on {unix or f'{host}:{port}'} "
+              f"with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+# load generator. Each connection keeps up to `window` queries in flight and records their latencies
+
+async def bench(host="127.0.0.1", port=8765, unix=None, requests=10000, concurrency=16, window=8,
+                algorithm="astar", distinct=1000, seed=None, encoding="cells"):
+    async def connect():
+        if unix:
+            return await asyncio.open_unix_connection(unix)
+        return await asyncio.open_connection(host, port)
+
+    reader, writer = await connect()
+    writer.write(b'{"id": 0, "op": "info"}\n')
+    await writer.drain()
+    rows = json.loads(await reader.readline())["rows"]
+    writer.close()
+
+    rng = random.Random(seed)
+    def cell():
+        return [rng.randrange(rows), rng.randrange(rows)]
+    queries = [(cell(), cell()) for _ in range(distinct)] # a small pool, so repeats exercise the cache
+    latencies = []
+    failures = 0
+
+    async def client(n):
+        nonlocal failures
+        reader, writer = await connect()
+        sent_at = {}
+        slots = asyncio.Semaphore(window)
+
+        async def receive():
+            nonlocal failures
+            for _ in range(n):
+                reply = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - sent_at.pop(reply["id"]))
+                failures += "error" in reply
+                slots.release()
+
+        receiver = asyncio.create_task(receive())
+        for i in range(n):
+            await slots.acquire()
+            start, end = rng.choice(queries)
+            sent_at[i] = time.perf_counter()
+            writer.write((json.dumps({"id": i, "algorithm": algorithm, "start": start, "end": end,
+                                     "encoding": encoding}) + "\n").encode())
+            await writer.drain()
+        await receiver
+        writer.close()
+
+    began = time.perf_counter()
+    share, extra = divmod(requests, concurrency)
+    await asyncio.gather(*(client(share + (i < extra)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - began
+
+    latencies.sort()
+    def percentile(p):
+        return 1000 * latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+    print(f"{len(latencies)} queries in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} queries/s, {failures} errors")
+    print(f"latency ms: p50 {percentile(50):.2f}  p90 {percentile(90):.2f}  "
+          f"p99 {percentile(99):.2f}  max {1000 * latencies[-1]:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shortest path query server over a grid map.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="load a map and answer queries")
+    serve_parser.add_argument("map_file")
+    serve_parser.add_argument("--workers", type=int, default=None)
+    serve_parser.add_argument("--cache-size", type=int, default=4096)
+    serve_parser.add_argument("--max-pending", type=int, default=None, help="searches handed to the pool at once")
+
+    bench_parser = sub.add_parser("bench", help="measure throughput and latency of a running server")
+    bench_parser.add_argument("--requests", type=int, default=10000)
+    bench_parser.add_argument("--concurrency", type=int, default=16, help="number of connections")
+    bench_parser.add_argument("--window", type=int, default=8, help="queries in flight per connection")
+    bench_parser.add_argument("--algorithm", choices=ALGORITHMS, default="astar")
+    bench_parser.add_argument("--distinct", type=int, default=1000, help="number of distinct queries")
+    bench_parser.add_argument("--seed", type=int, default=None)
+    bench_parser.add_argument("--encoding", choices=("cells", "rle"), default="cells", help="how paths are sent back")
+
+    for p in (serve_parser, bench_parser):
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+        p.add_argument("--unix", default=None, help="Unix socket path, used instead of host/port")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        async def run():
+            server = PathServer(args.map_file, args.workers, args.cache_size, args.max_pending)
+            await server.serve(args.host, args.port, args.unix)
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(bench(args.host, args.port, args.unix, args.requests, args.concurrency, args.window,
+                          args.algorithm, args.distinct, args.seed, args.encoding))
+
+
+if __name__ == "__main__":
+    main()
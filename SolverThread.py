@@ -0,0 +1,59 @@
+"""
+BACKGROUND SOLVER
+
+Runs a search on a worker thread, so the GUI event loop keeps drawing and answering the window while it works.
+
+The solve function is called with a report callback. It calls report() as it makes progress, optionally with a
+snapshot of that progress; the GUI picks up the newest snapshot with latest() when it draws the next frame.
+report() is also where a cancelled solve stops: it raises Cancelled, which ends the thread quietly. A solve that
+never reports cannot be stopped early, its result is just not used.
+
+USAGE:
+    solver = SolverThread(lambda report: algorithm(report, cells, start, end))
+    solver.start()
+    # every frame: draw, check solver.is_alive(), and solver.cancel() to give up
+"""
+
+import queue
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class SolverThread(threading.Thread):
+    def __init__(self, solve):
+        super().__init__(daemon=True) # never keeps the program running once the window is closed
+        self.solve = solve
+        self.snapshots = queue.Queue()
+        self.cancelled = threading.Event()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.solve(self.report)
+        except Cancelled:
+            pass
+        except Exception as e: # handed over to the GUI thread, which decides how to show it
+            self.error = e
+
+    def report(self, snapshot=None):
+        if self.cancelled.is_set():
+            raise Cancelled
+        if snapshot is not None:
+            self.snapshots.put(snapshot)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def latest(self, default=None):
+        """
+        The newest snapshot reported since the last call, or default if there is none.
+        """
+        while True:
+            try:
+                default = self.snapshots.get_nowait()
+            except queue.Empty:
+                return default
@@ -0,0 +1,187 @@
+"""
+ZOOMABLE GRID VIEWPORT
+
+Lets the grid GUIs (Astar.py, Dijkstra.py) show maps far larger than the window. The window looks at a square
+part of the map that can be zoomed and panned, and every frame costs about the same however large the map is:
+- Zoomed in, only the visible cells are drawn, in their own colours (start, end, open, closed, path, barrier).
+- Zoomed out, cells are merged into square tiles of 2x2, 4x4, ... cells, read from an obstacle pyramid, and each
+  tile is drawn as one pixel or more, darker the more of it is barrier. Only start and end are marked on top.
+Both are drawn as one small image scaled up to the screen, not as one rectangle per cell.
+
+As everywhere in these scripts, a cell's row runs along the screen's x axis and its column along the y axis.
+
+CONTROLS: mouse wheel or +/- to zoom, middle mouse drag or the arrow keys to pan, f to fit the whole map.
+"""
+
+import math
+
+import numpy as np
+import pygame
+
+WHITE = (255, 255, 255)
+GREY = (128, 128, 128)
+DETAIL_ZOOM = 4 # pixels per cell from which single cells, and their search colours, are drawn
+GRID_ZOOM = 8 # pixels per cell from which grid lines are drawn
+MAX_ZOOM = 64
+
+
+class ObstaclePyramid:
+    def __init__(self, barriers):
+        """
+        barriers is a rows x rows array of 0/1 flags indexed [row, col]. Level k counts the barriers in every
+        2^k x 2^k tile; level 0 is the map itself.
+        """
+        self.levels = [np.array(barriers, dtype=np.uint8)]
+        level = self.levels[0].astype(np.int32)
+        while max(level.shape) > 1:
+            rows, cols = level.shape
+            level = np.pad(level, ((0, rows % 2), (0, cols % 2))) # tiles past the edge count as open
+            level = level.reshape(level.shape[0] // 2, 2, level.shape[1] // 2, 2).sum(axis=(1, 3))
+            self.levels.append(level)
+
+    @classmethod
+    def from_cells(cls, cells):
+        return cls([[point.is_barrier() for point in row] for row in cells])
+
+    @classmethod
+    def from_grid(cls, grid):
+        return cls([np.frombuffer(bytes(grid.row(r)), dtype=np.uint8) for r in range(grid.rows)])
+
+    def set_barrier(self, row, col, barrier=True): # O(levels): only the tiles above this cell change
+        delta = int(barrier) - int(self.levels[0][row, col])
+        if not delta:
+            return
+        self.levels[0][row, col] = int(barrier)
+        for k in range(1, len(self.levels)):
+            self.levels[k][row >> k, col >> k] += delta
+
+    def tiles(self, level, r0, r1, c0, c1):
+        """
+        The barrier counts of level that cover cells r0:r1, c0:c1, and the (row, col) of its first tile.
+        """
+        tr, tc = r0 >> level, c0 >> level
+        return self.levels[level][tr:((r1 - 1) >> level) + 1, tc:((c1 - 1) >> level) + 1], tr, tc
+
+
+class Viewport:
+    def __init__(self, rows, width):
+        self.rows = rows
+        self.width = width # the window is width x width pixels
+        self.fit()
+
+    def fit(self):
+        self.min_zoom = self.width / self.rows
+        self.zoom = self.min_zoom # pixels per cell
+        self.row0 = self.col0 = 0.0 # the cell position at the top-left corner of the window
+
+    def clamp(self):
+        self.zoom = min(max(self.zoom, self.min_zoom), max(MAX_ZOOM, self.min_zoom))
+        span = self.width / self.zoom
+        self.row0 = min(max(self.row0, 0.0), self.rows - span)
+        self.col0 = min(max(self.col0, 0.0), self.rows - span)
+
+    def cell_at(self, pos):
+        """
+        The (row, col) of the cell under a screen position, or None if it is off the map.
+        """
+        row = math.floor(self.row0 + pos[0] / self.zoom)
+        col = math.floor(self.col0 + pos[1] / self.zoom)
+        if 0 <= row < self.rows and 0 <= col < self.rows:
+            return row, col
+        return None
+
+    def screen_pos(self, row, col):
+        return round((row - self.row0) * self.zoom), round((col - self.col0) * self.zoom)
+
+    def zoom_at(self, pos, factor): # the cell under pos stays where it is
+        row = self.row0 + pos[0] / self.zoom
+        col = self.col0 + pos[1] / self.zoom
+        self.zoom *= factor
+        self.clamp()
+        self.row0 = row - pos[0] / self.zoom
+        self.col0 = col - pos[1] / self.zoom
+        self.clamp()
+
+    def pan(self, dx, dy): # by a number of pixels
+        self.row0 -= dx / self.zoom
+        self.col0 -= dy / self.zoom
+        self.clamp()
+
+    def handle(self, event):
+        """
+        Zoom and pan on mouse and keyboard events. Returns True if the event moved the view.
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom_at(pygame.mouse.get_pos(), 1.25 ** event.y)
+        elif event.type == pygame.MOUSEMOTION and event.buttons[1]: # middle mouse drag
+            self.pan(*event.rel)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.zoom_at((self.width // 2, self.width // 2), 1.25)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.zoom_at((self.width // 2, self.width // 2), 0.8)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+            step = self.width // 8
+            dx = {pygame.K_LEFT: step, pygame.K_RIGHT: -step}.get(event.key, 0)
+            dy = {pygame.K_UP: step, pygame.K_DOWN: -step}.get(event.key, 0)
+            self.pan(dx, dy)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+            self.fit()
+        else:
+            return False
+        return True
+
+    def visible(self):
+        """
+        The cells in the window, as the ranges r0:r1, c0:c1.
+        """
+        span = self.width / self.zoom
+        r0, c0 = max(0, int(self.row0)), max(0, int(self.col0))
+        r1 = min(self.rows, math.ceil(self.row0 + span))
+        c1 = min(self.rows, math.ceil(self.col0 + span))
+        return r0, r1, c0, c1
+
+    def level(self, pyramid): # the finest pyramid level whose tiles are at least a pixel wide
+        level = max(0, math.ceil(math.log2(1 / self.zoom))) if self.zoom < 1 else 0
+        return min(level, len(pyramid.levels) - 1)
+
+    def blit_cells(self, win, colors, row, col, size):
+        """
+        Draw an (n, m, 3) array of colours, one per tile of size x size cells, with its first tile at (row, col).
+        """
+        x0, y0 = self.screen_pos(row, col)
+        x1, y1 = self.screen_pos(row + colors.shape[0] * size, col + colors.shape[1] * size)
+        image = pygame.surfarray.make_surface(colors)
+        win.blit(pygame.transform.scale(image, (max(1, x1 - x0), max(1, y1 - y0))), (x0, y0))
+
+    def draw_grid(self, win, r0, r1, c0, c1):
+        top, bottom = self.screen_pos(r0, c0)[1], self.screen_pos(r0, c1)[1]
+        left, right = self.screen_pos(r0, c0)[0], self.screen_pos(r1, c0)[0]
+        for row in range(r0, r1 + 1):
+            x = self.screen_pos(row, c0)[0]
+            pygame.draw.line(win, GREY, (x, top), (x, bottom))
+        for col in range(c0, c1 + 1):
+            y = self.screen_pos(r0, col)[1]
+            pygame.draw.line(win, GREY, (left, y), (right, y))
+
+    def render(self, win, cells, pyramid, markers=()):
+        """
+        Draw the visible part of the map. markers are the cells (e.g. start and end) that stay visible when
+        zoomed out.
+        """
+        win.fill(WHITE)
+        r0, r1, c0, c1 = self.visible()
+        if self.zoom >= DETAIL_ZOOM:
+            colors = np.array([[point.color for point in row[c0:c1]] for row in cells[r0:r1]], dtype=np.uint8)
+            self.blit_cells(win, colors, r0, c0, 1)
+            if self.zoom >= GRID_ZOOM:
+                self.draw_grid(win, r0, r1, c0, c1)
+            return
+
+        level = self.level(pyramid)
+        counts, tr, tc = pyramid.tiles(level, r0, r1, c0, c1)
+        shade = 255 - counts * 255 // (1 << 2 * level) # white when open, black when all barrier
+        self.blit_cells(win, np.repeat(shade.astype(np.uint8)[:, :, None], 3, axis=2), tr << level, tc << level,
+                        1 << level)
+        for point in markers:
+            if point is not None:
+                pygame.draw.circle(win, point.color, self.screen_pos(point.row + 0.5, point.col + 0.5), 4)